@@ -1,16 +1,59 @@
 # projectmind/agents/agent_factory.py
 
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from sqlalchemy import and_, select
 from sqlalchemy.orm import Session
+from projectmind.db.invalidation import INVALIDATION_CHANNEL
 from projectmind.db.session import engine
+from projectmind.db.session_async import AsyncSessionLocal
 from projectmind.db.models.agent import Agent as AgentModel
 from projectmind.db.models.llm_config import LLMConfig
 from projectmind.db.models.llm_model import LLMModel
 from projectmind.db.models.prompt import Prompt
 from projectmind.llm.llama_provider import LlamaProvider
 from projectmind.agents.base_agent import BaseAgent, AgentDefinition
+from projectmind.utils.single_flight import SingleFlight
 from loguru import logger
 
+# Seconds a resolved agent stays cached when no invalidation arrives.
+AGENT_CACHE_TTL = float(os.getenv("AGENT_CACHE_TTL", "300"))
+# Longest pause between reconnect attempts of the invalidation listener.
+INVALIDATION_RETRY_MAX = float(os.getenv("AGENT_INVALIDATION_RETRY_MAX", "60"))
+
+
+@dataclass
+class CachedAgent:
+    agent_row: AgentModel
+    prompt_row: Prompt
+    definition: AgentDefinition
+    llm: LlamaProvider
+    loaded_at: float
+
+
+def _build_definition(agent_row: AgentModel, prompt_row: Prompt) -> AgentDefinition:
+    return AgentDefinition(
+        name=agent_row.name,
+        role=agent_row.type,
+        goal=agent_row.goal,
+        type=agent_row.type,
+        test_prompt=agent_row.test_prompt,
+        system_prompt=prompt_row.system_prompt,
+        metadata={
+            "prompt_id": str(prompt_row.id),
+            "prompt_version": prompt_row.version,
+        },
+    )
+
+
 class AgentFactory:
+    _cache: dict[str, CachedAgent] = {}
+    # Concurrent cold resolves of one agent share a single load (and LlamaProvider)
+    _loads = SingleFlight()
+    _listener_task: asyncio.Task | None = None
+
     @staticmethod
     def create(agent_name: str) -> BaseAgent:
         with Session(engine) as session:
@@ -39,13 +82,134 @@ class AgentFactory:
 
             llm = LlamaProvider(config=config, model=model)
 
-            definition = AgentDefinition(
-                name=agent_row.name,
-                role=agent_row.type,
-                goal=agent_row.goal,
-                type=agent_row.type,
-                test_prompt=agent_row.test_prompt,
-                system_prompt=prompt_row.system_prompt,                
-            )
+            return BaseAgent(definition=_build_definition(agent_row, prompt_row), llm=llm)
+
+    @classmethod
+    async def aresolve(cls, agent_name: str) -> tuple[BaseAgent, AgentModel, Prompt]:
+        """
+        Returns (agent, agent_row, prompt_row) for an active agent.
+
+        The agent/config/model/prompt graph is loaded with one joined query and
+        cached in-process together with its LlamaProvider, so repeated calls are
+        a dictionary lookup until the TTL expires or invalidate() is called.
+        Each call gets its own BaseAgent with a copy of the definition.
+        """
+        cached = cls._cache.get(agent_name)
+        if not cached or time.monotonic() - cached.loaded_at > AGENT_CACHE_TTL:
+            fresh, shared = await cls._loads.do(agent_name, lambda: cls._load(agent_name))
+            if not shared:
+                cls._replace(agent_name, fresh)
+            cached = fresh
+
+        agent = BaseAgent(definition=cached.definition.model_copy(deep=True), llm=cached.llm)
+        return agent, cached.agent_row, cached.prompt_row
+
+    @classmethod
+    async def acreate(cls, agent_name: str) -> BaseAgent:
+        agent, _, _ = await cls.aresolve(agent_name)
+        return agent
+
+    @classmethod
+    def invalidate(cls, agent_name: str | None = None):
+        """Drops one cached agent (or all of them). Providers are released once in-flight runs finish."""
+        if agent_name is None:
+            dropped = list(cls._cache.values())
+            cls._cache.clear()
+        else:
+            dropped = [cls._cache.pop(agent_name)] if agent_name in cls._cache else []
+        for entry in dropped:
+            entry.llm.retire()
+        logger.debug(f"🧹 Agent cache invalidated: {agent_name or 'all'}")
+
+    @classmethod
+    def _replace(cls, agent_name: str, entry: CachedAgent):
+        previous = cls._cache.get(agent_name)
+        cls._cache[agent_name] = entry
+        if previous is not None and previous.llm is not entry.llm:
+            previous.llm.retire()
+
+    @classmethod
+    async def _load(cls, agent_name: str) -> CachedAgent:
+        logger.info(f"🧠 Loading agent '{agent_name}' dynamically from database")
+
+        stmt = (
+            select(AgentModel, LLMConfig, LLMModel, Prompt)
+            .outerjoin(LLMConfig, LLMConfig.id == AgentModel.llm_config_id)
+            .outerjoin(LLMModel, LLMModel.id == LLMConfig.llm_model_id)
+            .outerjoin(Prompt, and_(
+                Prompt.agent_name == AgentModel.name,
+                Prompt.task_type == "default",
+                Prompt.is_active == True,
+            ))
+            .where(AgentModel.name == agent_name, AgentModel.is_active == True)
+            .order_by(Prompt.created_at.desc())
+            .limit(1)
+        )
+        async with AsyncSessionLocal() as session:
+            row = (await session.execute(stmt)).first()
+
+        if not row:
+            raise ValueError(f"Agent '{agent_name}' not found")
+        agent_row, config, model, prompt_row = row
+        if not config:
+            raise ValueError(f"LLMConfig not found for agent '{agent_name}'")
+        if not model:
+            raise ValueError(f"LLMModel not found for agent '{agent_name}'")
+        if not prompt_row:
+            raise ValueError(f"No active prompt found for agent '{agent_name}'")
+
+        # A cold model load can take minutes; keep it off the event loop.
+        llm = await asyncio.to_thread(LlamaProvider, config=config, model=model)
+
+        return CachedAgent(
+            agent_row=agent_row,
+            prompt_row=prompt_row,
+            definition=_build_definition(agent_row, prompt_row),
+            llm=llm,
+            loaded_at=time.monotonic(),
+        )
+
+    @classmethod
+    def start_invalidation_listener(cls) -> asyncio.Task:
+        """Starts listen_for_invalidations() once per process and keeps a reference to it."""
+        if cls._listener_task is None or cls._listener_task.done():
+            cls._listener_task = asyncio.create_task(cls.listen_for_invalidations(), name="agent-invalidation-listener")
+        return cls._listener_task
+
+    @classmethod
+    async def listen_for_invalidations(cls):
+        """
+        Invalidates cached agents when another process sends
+        NOTIFY projectmind_agents, '<agent_name>' (an empty payload clears everything).
+        Reconnects with backoff when the connection drops; since notifications sent
+        meanwhile are lost, the whole cache is dropped after a reconnect.
+        Runs until cancelled.
+        """
+        import asyncpg
+
+        url = os.getenv("ASYNC_DATABASE_URL", "").replace("postgresql+asyncpg://", "postgresql://")
+        delay, connected_before = 1.0, False
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(url)
+                lost = asyncio.Event()
+                conn.add_termination_listener(lambda _conn: lost.set())
+                await conn.add_listener(INVALIDATION_CHANNEL, lambda *args: cls.invalidate(args[-1] or None))
+                if connected_before:
+                    cls.invalidate()
+                connected_before, delay = True, 1.0
+                logger.info(f"👂 Listening for agent invalidations on '{INVALIDATION_CHANNEL}'")
+                await lost.wait()
+                logger.warning("⚠️ Invalidation listener lost its connection")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Invalidation listener failed: {e}")
+            finally:
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
 
-            return BaseAgent(definition=definition, llm=llm)
+            logger.info(f"🔁 Reconnecting invalidation listener in {delay:.0f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, INVALIDATION_RETRY_MAX)
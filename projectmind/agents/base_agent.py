@@ -1,8 +1,20 @@
+import asyncio
+import hashlib
+import os
+import threading
 from pydantic import BaseModel, Field
 from loguru import logger
-from typing import Optional
+from typing import AsyncIterator, Optional
 from projectmind.llm.llama_provider import LlamaProvider
 from projectmind.llm.prompt_formatter import format_prompt
+from projectmind.llm.scheduler import inference_scheduler
+from projectmind.utils.single_flight import SingleFlight, SharedStream
+
+# Identical concurrent arun() (or astream()) calls share one generation (set to 0 to disable).
+COALESCE_REQUESTS = os.getenv("AGENT_COALESCE_REQUESTS", "1") != "0"
+
+agent_flights = SingleFlight()
+agent_streams = SharedStream()
 
 class AgentDefinition(BaseModel):
     name: str
@@ -31,31 +43,180 @@ class BaseAgent:
     def agent_type(self) -> str:
         return self.definition.type
 
-    def run(self, input: str) -> str:
-        logger.debug(f"🧠 Agent '{self.name}' received input:\n{input}")
+    @property
+    def prompt_key(self) -> tuple | None:
+        """(prompt_id, prompt_version) of the active system prompt, used to reuse its KV cache."""
+        metadata = self.definition.metadata
+        if metadata.get("prompt_id") is None:
+            return None
+        return metadata["prompt_id"], metadata.get("prompt_version")
 
-        try:
-            system_prompt = self.definition.system_prompt
-            if not system_prompt or not isinstance(system_prompt, str):
-                raise ValueError(f"❌ Invalid or missing system prompt for agent '{self.name}'")
+    def _build_messages(self, input: str) -> list[dict]:
+        system_prompt = self.definition.system_prompt
+        if not system_prompt or not isinstance(system_prompt, str):
+            raise ValueError(f"❌ Invalid or missing system prompt for agent '{self.name}'")
 
-            if not input or not isinstance(input, str):
-                raise ValueError(f"❌ Invalid user input for agent '{self.name}'")
+        if not input or not isinstance(input, str):
+            raise ValueError(f"❌ Invalid user input for agent '{self.name}'")
 
-            messages = format_prompt(
-                system_prompt=system_prompt.strip(),
-                user_prompt=input.strip(),
-                chat_format=self.llm.model.chat_format or "llama-2"
-            )
+        return format_prompt(
+            system_prompt=system_prompt.strip(),
+            user_prompt=input.strip(),
+            chat_format=self.llm.model.chat_format or "llama-2"
+        )
+
+    def _failure(self, error: Exception, stats: dict | None = None) -> str:
+        logger.error(f"❌ Error generating response for agent '{self.name}': {error}")
+        if stats is not None:
+            stats["error"] = str(error)
+        return f"⚠️ Failed to generate response: {str(error)}"
+
+    def run(self, input: str, cancel_event: threading.Event | None = None, stats: dict | None = None) -> str:
+        """
+        Generates a response on the calling thread.
 
-            response = self.llm.chat(messages)
+        Error contract (shared by arun() and astream()): a failed generation is
+        never raised, it comes back as "⚠️ Failed to generate response: <error>"
+        so callers handle one shape; `stats["error"]` is set when one is given.
+        Only timeouts and cancellation raise.
+        """
+        logger.debug(f"🧠 Agent '{self.name}' received input:\n{input}")
+
+        try:
+            messages = self._build_messages(input)
+            response = self.llm.chat(messages, prompt_key=self.prompt_key, cancel_event=cancel_event, stats=stats)
             logger.debug(f"✅ LLM response:\n{response}")
             return response
 
         except Exception as e:
-            logger.error(f"❌ Error generating response for agent '{self.name}': {e}")
-            return f"⚠️ Failed to generate response: {str(e)}"
+            return self._failure(e, stats)
+
+    def _flight_key(self, input: str) -> tuple:
+        """Identity of a generation: model, sampling, prompt version and the full input (context included)."""
+        llm = self.llm
+        digest = hashlib.sha256(
+            f"{self.definition.system_prompt}\0{input}".encode("utf-8")
+        ).hexdigest()
+        return (
+            llm.fingerprint, self.name, self.prompt_key,
+            llm.temperature, llm.top_p, llm.max_tokens, llm.seed, digest,
+        )
+
+    async def arun(self, input: str, timeout: float | None = None, stats: dict | None = None) -> str:
+        """
+        Runs the agent on its model's scheduler slot without blocking the event loop.
+
+        Identical requests that arrive while one is in flight await the same
+        generation; `stats["coalesced"]` tells whether this call reused another's.
+        If the caller is cancelled or `timeout` (seconds) expires, it stops waiting;
+        a queued request is dropped and a running generation stops at its next token
+        once no other caller waits on it. Generation errors come back as run() returns them.
+        """
+        if COALESCE_REQUESTS:
+            flight = agent_flights.do(self._flight_key(input), lambda: self._generate(input))
+        else:
+            flight = self._generate_unshared(input)
+        (output, run_stats), shared = await asyncio.wait_for(flight, timeout)
+
+        if stats is not None:
+            stats.update(run_stats)
+            stats["coalesced"] = shared
+        return output
+
+    async def _generate_unshared(self, input: str) -> tuple[tuple[str, dict], bool]:
+        return await self._generate(input), False
+
+    async def _generate(self, input: str) -> tuple[str, dict]:
+        stats: dict = {}
+        cancel_event = threading.Event()
+        future = inference_scheduler.submit(self.llm, self.run, input, cancel_event=cancel_event, stats=stats)
+        try:
+            output = await asyncio.wrap_future(future)
+            stats["queue_wait_ms"] = round(getattr(future, "queue_wait_ms", 0.0), 1)
+            return output, stats
+        except asyncio.CancelledError:
+            cancel_event.set()
+            future.cancel()
+            raise
+
+    async def astream(self, input: str, timeout: float | None = None, stats: dict | None = None) -> AsyncIterator[str]:
+        """
+        Yields token deltas as the model generates them.
+
+        llama.cpp runs on the model's scheduler slot and hands each delta to the event loop,
+        so the first token reaches the caller as soon as prompt processing ends.
+        Identical concurrent streams share one generation like arun() does; a late
+        joiner first receives the deltas produced so far. `timeout` (seconds) bounds
+        the whole stream: on expiry asyncio.TimeoutError is raised and the generation
+        stops at its next token once no other consumer follows it.
+        Failures follow run(): the stream ends with the "⚠️ Failed to generate
+        response: ..." text (after any deltas already produced) instead of raising.
+        """
+        logger.debug(f"🧠 Agent '{self.name}' received input (streaming):\n{input}")
+
+        try:
+            messages = self._build_messages(input)
+        except Exception as e:
+            yield self._failure(e, stats)
+            return
+        if COALESCE_REQUESTS:
+            stream, run_stats, shared = agent_streams.subscribe(
+                self._flight_key(input), lambda state: self._stream(messages, state)
+            )
+        else:
+            run_stats, shared = {}, False
+            stream = self._stream(messages, run_stats)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout else None
+        try:
+            while True:
+                remaining = None if deadline is None else max(deadline - loop.time(), 0)
+                try:
+                    delta = await asyncio.wait_for(stream.__anext__(), remaining)
+                except StopAsyncIteration:
+                    break
+                yield delta
+        finally:
+            await stream.aclose()
+
+        if stats is not None:
+            stats.update(run_stats)
+            stats["coalesced"] = shared
 
-    async def arun(self, input: str) -> str:
-        from asyncio import to_thread
-        return await to_thread(self.run, input)
+    async def _stream(self, messages: list[dict], stats: dict) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+        cancelled = threading.Event()
+
+        def produce():
+            try:
+                for delta in self.llm.chat_stream(messages, prompt_key=self.prompt_key, stats=stats):
+                    if cancelled.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, delta)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        job = inference_scheduler.submit(self.llm, produce)
+        producer = asyncio.wrap_future(job)
+        produced = False
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    # Ends the stream (and every coalesced follower) the way run() reports errors
+                    yield ("\n\n" if produced else "") + self._failure(item, stats)
+                    continue
+                produced = True
+                yield item
+        finally:
+            cancelled.set()
+            job.cancel()  # still queued: never starts; running: stops at its next token
+            await asyncio.gather(producer, return_exceptions=True)
+            stats["queue_wait_ms"] = round(getattr(job, "queue_wait_ms", 0.0), 1)
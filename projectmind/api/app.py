@@ -0,0 +1,32 @@
+# projectmind/api/app.py
+
+import asyncio
+import os
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from loguru import logger
+
+from projectmind.api import tasks
+from projectmind.utils.metrics import registry
+
+# Serve the API (and /metrics) from inside a long-running process, e.g. the Slack listener.
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+app = FastAPI(title="ProjectMind")
+app.include_router(tasks.router)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def serve_in_background(port: int = METRICS_PORT) -> asyncio.Task | None:
+    """Starts uvicorn on the running loop so /metrics reports this process's own counters."""
+    if not port:
+        return None
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="0.0.0.0", port=port, log_level="warning"))
+    logger.info(f"📈 Serving API and /metrics on :{port}")
+    return asyncio.create_task(server.serve())
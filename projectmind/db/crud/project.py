@@ -2,7 +2,8 @@
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from uuid import UUID
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from uuid import UUID, uuid4
 from projectmind.db.models.project import Project
 import logging
 
@@ -27,3 +28,17 @@ async def create_project(session: AsyncSession, project_id: str, name: str = Non
     await session.refresh(project)
     logger.info(f"Created new project with id {project_id}")
     return project
+
+
+async def get_or_create_project(session: AsyncSession, name: str) -> Project:
+    """Race-safe get-or-create that only flushes, so it can join the caller's transaction."""
+    project = await get_project_by_name(session, name)
+    if project:
+        return project
+    await session.execute(
+        pg_insert(Project)
+        .values(id=uuid4(), name=name, description="")
+        .on_conflict_do_nothing(index_elements=[Project.name])
+    )
+    logger.info(f"Created new project '{name}'")
+    return await get_project_by_name(session, name)
@@ -0,0 +1,51 @@
+# projectmind/db/invalidation.py
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from projectmind.db.models.agent import Agent
+from projectmind.db.models.llm_config import LLMConfig
+from projectmind.db.models.llm_model import LLMModel
+from projectmind.db.models.prompt import Prompt
+
+# Listened to by AgentFactory.listen_for_invalidations(); payload = agent name, empty = every agent.
+INVALIDATION_CHANNEL = "projectmind_agents"
+
+_WATCHED = (Agent, LLMConfig, LLMModel, Prompt)
+_NOTIFY = text("SELECT pg_notify(:channel, :payload)")
+
+
+def _payload(obj) -> str | None:
+    if isinstance(obj, Agent):
+        return obj.name or ""
+    if isinstance(obj, Prompt):
+        return obj.agent_name or ""
+    if isinstance(obj, (LLMConfig, LLMModel)):
+        return ""  # shared by several agents
+    return None
+
+
+def _notify(session: Session, payloads: set[str]):
+    # One empty payload already clears everything
+    for payload in ({""} if "" in payloads else payloads):
+        session.connection().execute(_NOTIFY, {"channel": INVALIDATION_CHANNEL, "payload": payload})
+
+
+@event.listens_for(Session, "after_flush")
+def _notify_flushed_changes(session: Session, flush_context):
+    """
+    Every ORM write to a row a cached agent depends on (agent, llm_config,
+    llm_model, prompt) queues a NOTIFY in the same transaction, so it reaches
+    the listeners exactly when the change commits (and never on rollback).
+    """
+    payloads = {p for obj in (*session.new, *session.dirty, *session.deleted) if (p := _payload(obj)) is not None}
+    if payloads:
+        _notify(session, payloads)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _notify_bulk_changes(orm_execute_state):
+    """Bulk update()/delete() statements bypass the flush; invalidate every agent for those."""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if any(mapper.class_ in _WATCHED for mapper in orm_execute_state.all_mappers):
+        _notify(orm_execute_state.session, {""})
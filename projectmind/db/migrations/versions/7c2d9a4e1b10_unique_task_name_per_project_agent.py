@@ -0,0 +1,37 @@
+"""Unique task name per project and agent
+
+Revision ID: 7c2d9a4e1b10
+Revises: 41e1c71e5fdb
+Create Date: 2026-10-18 10:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2d9a4e1b10'
+down_revision: Union[str, None] = '41e1c71e5fdb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keep the oldest row of each duplicate group before adding the constraint
+    op.execute("""
+        DELETE FROM tasks t
+        USING tasks d
+        WHERE t.project_id = d.project_id
+          AND t.agent_name = d.agent_name
+          AND t.task_name = d.task_name
+          AND (t.created_at, t.id::text) > (d.created_at, d.id::text)
+    """)
+    op.create_index('uq_tasks_project_agent_task_name', 'tasks', ['project_id', 'agent_name', 'task_name'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_tasks_project_agent_task_name', table_name='tasks')
@@ -0,0 +1,28 @@
+"""Memory embeddings
+
+Revision ID: b3f1e8c5d2a7
+Revises: 7c2d9a4e1b10
+Create Date: 2026-10-18 11:04:17.532901
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f1e8c5d2a7'
+down_revision: Union[str, None] = '7c2d9a4e1b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('memories', sa.Column('embedding', sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('memories', 'embedding')
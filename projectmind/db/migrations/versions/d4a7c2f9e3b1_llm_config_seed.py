@@ -0,0 +1,28 @@
+"""LLM config seed
+
+Revision ID: d4a7c2f9e3b1
+Revises: b3f1e8c5d2a7
+Create Date: 2026-10-18 13:22:41.108374
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a7c2f9e3b1'
+down_revision: Union[str, None] = 'b3f1e8c5d2a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('llm_configs', sa.Column('seed', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('llm_configs', 'seed')
@@ -0,0 +1,38 @@
+"""Task execution leases
+
+Revision ID: e8b2f6a1c4d9
+Revises: d4a7c2f9e3b1
+Create Date: 2026-10-18 14:05:12.640219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b2f6a1c4d9'
+down_revision: Union[str, None] = 'd4a7c2f9e3b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tasks', sa.Column('assigned_agent', sa.String(length=50), nullable=True))
+    op.add_column('tasks', sa.Column('claimed_by', sa.String(length=100), nullable=True))
+    op.add_column('tasks', sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('tasks', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('tasks', sa.Column('run_id', sa.Integer(), nullable=True))
+    op.create_index('ix_tasks_status_lease', 'tasks', ['status', 'lease_expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_status_lease', table_name='tasks')
+    op.drop_column('tasks', 'run_id')
+    op.drop_column('tasks', 'attempts')
+    op.drop_column('tasks', 'lease_expires_at')
+    op.drop_column('tasks', 'claimed_by')
+    op.drop_column('tasks', 'assigned_agent')
@@ -0,0 +1,54 @@
+"""Agent run telemetry
+
+Revision ID: f1c9a3d7b5e2
+Revises: e8b2f6a1c4d9
+Create Date: 2026-10-18 15:12:36.284517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c9a3d7b5e2'
+down_revision: Union[str, None] = 'e8b2f6a1c4d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('agent_runs', sa.Column('prompt_tokens', sa.Integer(), nullable=True))
+    op.add_column('agent_runs', sa.Column('completion_tokens', sa.Integer(), nullable=True))
+    op.add_column('agent_runs', sa.Column('ttft_ms', sa.Float(), nullable=True))
+    op.add_column('agent_runs', sa.Column('prompt_eval_ms', sa.Float(), nullable=True))
+    op.add_column('agent_runs', sa.Column('generation_ms', sa.Float(), nullable=True))
+    op.add_column('agent_runs', sa.Column('model_load_ms', sa.Float(), nullable=True))
+    op.add_column('agent_runs', sa.Column('model_cache_hit', sa.Boolean(), nullable=True))
+    op.add_column('agent_runs', sa.Column('queue_wait_ms', sa.Float(), nullable=True))
+    op.add_column('agent_runs', sa.Column('db_ms', sa.Float(), nullable=True))
+    op.add_column('agent_runs', sa.Column('rss_mb', sa.Float(), nullable=True))
+    op.create_index('ix_agent_runs_agent_created', 'agent_runs', ['agent_name', 'created_at'], unique=False)
+    op.create_index('ix_agent_runs_model_created', 'agent_runs', ['model_used', 'created_at'], unique=False)
+    op.create_index('ix_agent_runs_agent_ttft', 'agent_runs', ['agent_name', 'ttft_ms'], unique=False)
+    op.create_index('ix_agent_runs_model_generation', 'agent_runs', ['model_used', 'generation_ms'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_agent_runs_model_generation', table_name='agent_runs')
+    op.drop_index('ix_agent_runs_agent_ttft', table_name='agent_runs')
+    op.drop_index('ix_agent_runs_model_created', table_name='agent_runs')
+    op.drop_index('ix_agent_runs_agent_created', table_name='agent_runs')
+    op.drop_column('agent_runs', 'rss_mb')
+    op.drop_column('agent_runs', 'db_ms')
+    op.drop_column('agent_runs', 'queue_wait_ms')
+    op.drop_column('agent_runs', 'model_cache_hit')
+    op.drop_column('agent_runs', 'model_load_ms')
+    op.drop_column('agent_runs', 'generation_ms')
+    op.drop_column('agent_runs', 'prompt_eval_ms')
+    op.drop_column('agent_runs', 'ttft_ms')
+    op.drop_column('agent_runs', 'completion_tokens')
+    op.drop_column('agent_runs', 'prompt_tokens')
@@ -9,5 +9,7 @@ from projectmind.db.models.agent_run import AgentRun
 from projectmind.db.models.memory import Memory  
 from projectmind.db.models.llm_model import LLMModel
 from projectmind.db.models.llm_config import LLMConfig
+# Registers the NOTIFY hooks for agent cache invalidation on every Session
+import projectmind.db.invalidation  # noqa: E402,F401
 
 __all__ = ["Base", "Prompt", "Project", "Task", "Agent", "AgentRun", "Memory", "LLMModel", "LLMConfig"]
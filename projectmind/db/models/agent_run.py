@@ -32,9 +32,26 @@ class AgentRun(Base):
     config_used = Column(JSON, nullable=True)
     extra = Column(JSON, nullable=True)
 
+    # Performance telemetry (NULL when not measured, e.g. runs served from the response cache
+    # or coalesced onto another run's generation)
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
+    ttft_ms = Column(Float, nullable=True)
+    prompt_eval_ms = Column(Float, nullable=True)
+    generation_ms = Column(Float, nullable=True)
+    model_load_ms = Column(Float, nullable=True)
+    model_cache_hit = Column(Boolean, nullable=True)
+    queue_wait_ms = Column(Float, nullable=True)
+    db_ms = Column(Float, nullable=True)
+    rss_mb = Column(Float, nullable=True)
+
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     __table_args__ = (
         Index("ix_agent_runs_agent_task", "agent_name", "task_type"),  # ✅ índice compuesto real
+        Index("ix_agent_runs_agent_created", "agent_name", "created_at"),
+        Index("ix_agent_runs_model_created", "model_used", "created_at"),
+        Index("ix_agent_runs_agent_ttft", "agent_name", "ttft_ms"),
+        Index("ix_agent_runs_model_generation", "model_used", "generation_ms"),
     )
@@ -17,4 +17,5 @@ class LLMConfig(Base):
     max_tokens = Column(Integer, default=1024)
     top_p = Column(Float, default=1.0)
     stop_tokens = Column(JSONB, nullable=True)
+    seed = Column(Integer, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Text, Index, ForeignKey
+from sqlalchemy import Column, String, DateTime, Text, Index, ForeignKey, LargeBinary
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
@@ -17,6 +17,7 @@ class Memory(Base):
     project_name = Column(String, nullable=True)
     agent_name = Column(String, nullable=True)
     task_type = Column(String, nullable=True)
+    embedding = Column(LargeBinary, nullable=True)          # float16, L2-normalized
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     __table_args__ = (
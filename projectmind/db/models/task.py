@@ -1,6 +1,6 @@
 # projectmind/db/models/task.py
 
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Index
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Index, Integer
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 import uuid
@@ -19,7 +19,15 @@ class Task(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), index=True)
     dependencies = Column(Text, nullable=True)
+    # Execution bookkeeping for projectmind.tasks.task_worker
+    assigned_agent = Column(String(50), nullable=True)
+    claimed_by = Column(String(100), nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    run_id = Column(Integer, nullable=True)
 
     __table_args__ = (
         Index('ix_project_status', 'project_id', 'status'),
+        Index('uq_tasks_project_agent_task_name', 'project_id', 'agent_name', 'task_name', unique=True),
+        Index('ix_tasks_status_lease', 'status', 'lease_expires_at'),
     )
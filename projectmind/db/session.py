@@ -4,6 +4,8 @@ import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
+from projectmind.utils.metrics import instrument_engine
+from projectmind.utils import tracing
 
 load_dotenv()
 
@@ -12,6 +14,8 @@ if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set in .env")
 
 engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+instrument_engine(engine)
+tracing.instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_session():
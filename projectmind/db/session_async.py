@@ -4,6 +4,8 @@ import os
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
+from projectmind.utils.metrics import instrument_engine
+from projectmind.utils import tracing
 
 load_dotenv()
 
@@ -12,6 +14,8 @@ if not ASYNC_DATABASE_URL or not ASYNC_DATABASE_URL.startswith("postgresql+async
     raise ValueError("ASYNC_DATABASE_URL must use 'postgresql+asyncpg://' for async support")
 
 async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=False)
+instrument_engine(async_engine.sync_engine)
+tracing.instrument_engine(async_engine.sync_engine)
 AsyncSessionLocal = sessionmaker(async_engine, expire_on_commit=False, class_=AsyncSession)
 
 async def get_async_session() -> AsyncSession:
@@ -0,0 +1,145 @@
+# projectmind/interface/job_queue.py
+
+import asyncio
+import itertools
+import os
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+from loguru import logger
+
+# Lower runs first. Quick question-style agents go ahead of long code generators by default.
+DEFAULT_PRIORITY = 5
+DEFAULT_AGENT_PRIORITIES = {"planner": 1, "translator": 1, "summarizer": 3}
+
+
+def _parse_priorities(raw: str | None) -> dict[str, int]:
+    """Parses JOB_PRIORITIES, e.g. "planner=0,backend_generator=8"."""
+    priorities = dict(DEFAULT_AGENT_PRIORITIES)
+    for item in (raw or "").split(","):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            priorities[name.strip()] = int(value)
+    return priorities
+
+
+@dataclass(order=True)
+class Job:
+    priority: int
+    seq: int
+    fn: Callable[[], Awaitable[Any]] = field(compare=False)
+    user: str | None = field(default=None, compare=False)
+    label: str = field(default="", compare=False)
+    enqueued_at: float = field(default_factory=time.monotonic, compare=False)
+
+
+class JobQueue:
+    """
+    In-process priority queue between the Slack handlers and inference.
+
+    Handlers enqueue and return at once (Slack gets its ack well inside the 3s
+    window); a fixed pool of workers drains jobs by priority, FIFO within the
+    same priority. Each job's priority comes from its agent (JOB_PRIORITIES) plus
+    one step per job the same user already has queued or running, so a single
+    user's burst cannot starve everyone else.
+    """
+
+    def __init__(self, workers: int, max_depth: int, priorities: dict[str, int] | None = None):
+        self.workers = max(workers, 1)
+        self.priorities = priorities or {}
+        self._queue: asyncio.PriorityQueue[Job] = asyncio.PriorityQueue(maxsize=max_depth)
+        self._seq = itertools.count()
+        self._tasks: list[asyncio.Task] = []
+        self._user_load: dict[str, int] = defaultdict(int)
+        self._pending: dict[int, Job] = {}  # queued, not yet picked up by a worker; keyed by seq
+        self.active = 0
+        self.rejected = 0
+        self.completed: dict[int, int] = defaultdict(int)
+        self.failed: dict[int, int] = defaultdict(int)
+        self.wait_ms: dict[int, deque[float]] = defaultdict(lambda: deque(maxlen=500))
+        self.started_at = time.monotonic()
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._work(i), name=f"job-worker-{i}") for i in range(self.workers)]
+            logger.info(f"🧵 Started {self.workers} job worker(s)")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def priority_for(self, agent_name: str, user: str | None = None) -> int:
+        base = self.priorities.get(agent_name, DEFAULT_PRIORITY)
+        return base + (self._user_load[user] if user else 0)
+
+    def submit(self, fn: Callable[[], Awaitable[Any]], agent_name: str, user: str | None = None) -> Job | None:
+        """Enqueues a job. Returns None when the queue is full."""
+        job = Job(priority=self.priority_for(agent_name, user), seq=next(self._seq), fn=fn, user=user, label=agent_name)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            logger.warning(f"🚫 Job queue full ({self._queue.qsize()}), rejected '{agent_name}' for {user}")
+            return None
+        self._pending[job.seq] = job
+        if user:
+            self._user_load[user] += 1
+        logger.debug(f"📬 Queued '{agent_name}' for {user} (priority {job.priority}, depth {self._queue.qsize()})")
+        return job
+
+    def position(self, job: Job) -> int:
+        """Jobs still waiting that a worker will pick up before `job`."""
+        return sum(1 for queued in self._pending.values() if queued < job)
+
+    async def _work(self, index: int):
+        while True:
+            job = await self._queue.get()
+            self._pending.pop(job.seq, None)
+            wait_ms = (time.monotonic() - job.enqueued_at) * 1000
+            self.wait_ms[job.priority].append(wait_ms)
+            self.active += 1
+            try:
+                await job.fn()
+                self.completed[job.priority] += 1
+            except Exception:
+                self.failed[job.priority] += 1
+                logger.exception(f"❌ Job '{job.label}' failed")
+            finally:
+                self.active -= 1
+                if job.user:
+                    self._user_load[job.user] -= 1
+                    if self._user_load[job.user] <= 0:
+                        del self._user_load[job.user]
+                self._queue.task_done()
+                logger.debug(f"✅ Job '{job.label}' done (waited {wait_ms:.0f} ms, worker {index})")
+
+    def stats(self) -> dict:
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        per_priority = {}
+        for priority in sorted(set(self.completed) | set(self.failed) | set(self.wait_ms)):
+            waits = sorted(self.wait_ms[priority])
+            per_priority[priority] = {
+                "completed": self.completed[priority],
+                "failed": self.failed[priority],
+                "per_minute": self.completed[priority] * 60 / elapsed,
+                "wait_ms_avg": sum(waits) / len(waits) if waits else 0.0,
+                "wait_ms_p95": waits[int(len(waits) * 0.95)] if waits else 0.0,
+            }
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_depth": self._queue.maxsize,
+            "active": self.active,
+            "workers": self.workers,
+            "rejected": self.rejected,
+            "priorities": per_priority,
+        }
+
+
+job_queue = JobQueue(
+    workers=int(os.getenv("SLACK_JOB_WORKERS", "4")),
+    max_depth=int(os.getenv("SLACK_JOB_QUEUE_MAX", "100")),
+    priorities=_parse_priorities(os.getenv("JOB_PRIORITIES")),
+)
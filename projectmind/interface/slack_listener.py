@@ -1,6 +1,7 @@
 import os
 import asyncio
 import re
+import time
 from dotenv import load_dotenv
 from slack_bolt.async_app import AsyncApp
 from slack_bolt.adapter.socket_mode.aiohttp import AsyncSocketModeHandler
@@ -9,11 +10,21 @@ from loguru import logger
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
-from projectmind.workflows.agent_flow import agent_flow
+from projectmind.workflows.flow_builder import stream_agent_flow
 from projectmind.db.models.agent import Agent
+from projectmind.agents.agent_factory import AgentFactory
+from projectmind.interface.job_queue import job_queue
+from projectmind.api.app import serve_in_background
+from projectmind.utils.tracing import open_span, end_span, use_span, traced
 
 load_dotenv()
 
+# Streaming replies: edit the placeholder after this many new tokens or seconds, whichever comes first.
+SLACK_STREAM_EVERY_TOKENS = int(os.getenv("SLACK_STREAM_EVERY_TOKENS", "40"))
+SLACK_STREAM_INTERVAL = float(os.getenv("SLACK_STREAM_INTERVAL", "1.0"))
+# Slack truncates long messages; in-progress edits only show the tail.
+SLACK_PREVIEW_CHARS = 3000
+
 app = AsyncApp(token=os.getenv("SLACK_BOT_TOKEN"))
 
 engine = create_async_engine(os.getenv("ASYNC_DATABASE_URL"), echo=False)
@@ -43,47 +54,124 @@ async def list_agents(event, say):
 
         await say(message)
 
-@app.message("")
-async def handle_message(event, say):
-    user_prompt = event.get("text", "").strip()
+@app.message(re.compile("^queue$", re.IGNORECASE))
+async def queue_stats(event, say):
+    stats = job_queue.stats()
+    message = (
+        f"*📊 Job queue:* {stats['queue_depth']}/{stats['max_depth']} queued, "
+        f"{stats['active']}/{stats['workers']} running, {stats['rejected']} rejected\n"
+    )
+    for priority, p in stats["priorities"].items():
+        message += (
+            f"- priority {priority}: {p['completed']} done, {p['failed']} failed, "
+            f"wait avg {p['wait_ms_avg'] / 1000:.1f}s / p95 {p['wait_ms_p95'] / 1000:.1f}s\n"
+        )
+    await say(message)
+
+def format_reply(agent_name: str, input_text: str, output: str, footer: str) -> str:
+    message = f"*🤖 Agent: `{agent_name}`*\n"
+    message += f"*📥 Input:* `{input_text}`\n"
+    message += f"*📤 Output:*\n```{output or ' '}```\n"
+    return message + footer
+
+@traced("slack.run_and_reply")
+async def run_and_reply(event, say, agent_name: str, input_text: str):
+    """
+    Posts a placeholder and edits it with chat.update while tokens stream in.
+
+    Edits happen every SLACK_STREAM_EVERY_TOKENS tokens or SLACK_STREAM_INTERVAL
+    seconds and run in the background; while one edit is in flight newer tokens
+    just accumulate, so Slack's rate limit paces the edits, never generation.
+    """
     user = event["user"]
-    logger.info(f"📩 Message from {user}: {user_prompt}")
+    placeholder = await say(format_reply(agent_name, input_text, "", "_⏳ Generating…_"))
+    channel, ts = placeholder["channel"], placeholder["ts"]
 
-    if not user_prompt:
-        await say("⚠️ I didn't receive any input.")
-        return
+    chunks: list[str] = []
+    pending_edit: asyncio.Task | None = None
+    last_edit = time.monotonic()
+    tokens_since_edit = 0
 
-    try:
-        agent_name, input_text = parse_message(user_prompt)
-
-        flow = agent_flow()
+    async def edit(text: str):
+        try:
+            await app.client.chat_update(channel=channel, ts=ts, text=text)
+        except Exception as e:
+            logger.warning(f"⚠️ Slack update failed: {e}")
 
-        # ✅ Aquí se corrigió con `await`
-        result = await flow.ainvoke({
+    try:
+        result = None
+        async for update in stream_agent_flow({
             "agent_name": agent_name,
             "input": input_text,
             "slack_user": user
-        })
-
-        output = result.get("output", "[No output]")
-        run_id = result.get("run_id")
-        extra = result.get("extra", {})
+        }, thread_id=f"slack-{event.get('channel')}-{event.get('ts')}"):
+            if "result" in update:
+                result = update["result"]
+                continue
+
+            chunks.append(update["token"])
+            tokens_since_edit += 1
+            due = tokens_since_edit >= SLACK_STREAM_EVERY_TOKENS or time.monotonic() - last_edit >= SLACK_STREAM_INTERVAL
+            if due and (pending_edit is None or pending_edit.done()):
+                preview = "".join(chunks)[-SLACK_PREVIEW_CHARS:]
+                pending_edit = asyncio.create_task(edit(format_reply(agent_name, input_text, preview, "_⏳ Generating…_")))
+                last_edit = time.monotonic()
+                tokens_since_edit = 0
+
+        if pending_edit is not None:
+            await pending_edit
+
+        output = (result or {}).get("output", "[No output]")
+        run_id = (result or {}).get("run_id")
+        extra = (result or {}).get("extra", {})
         task_count = len(extra.get("task_ids", [])) if extra else 0
 
-        message = f"*🤖 Agent: `{agent_name}`*\n"
-        message += f"*📥 Input:* `{input_text}`\n"
-        message += f"*📤 Output:*\n```{output}```\n"
+        footer = ""
         if task_count:
-            message += f"*📝 {task_count} tasks stored in DB.*\n"
-        message += f"*🆔 Run ID:* `{run_id}`"
-
-        await say(message)
+            footer += f"*📝 {task_count} tasks stored in DB.*\n"
+        footer += f"*🆔 Run ID:* `{run_id}`"
+        await edit(format_reply(agent_name, input_text, output, footer))
 
     except Exception as e:
         logger.exception("❌ Agent error")
-        await say(f"❌ Error: {str(e)}")
+        if pending_edit is not None:
+            await pending_edit
+        await edit(format_reply(agent_name, input_text, "".join(chunks)[-SLACK_PREVIEW_CHARS:], f"❌ Error: {str(e)}"))
+
+@app.message("")
+async def handle_message(event, say):
+    user_prompt = event.get("text", "").strip()
+    user = event["user"]
+    logger.info(f"📩 Message from {user}: {user_prompt}")
+
+    if not user_prompt:
+        await say("⚠️ I didn't receive any input.")
+        return
+
+    # Return right away so Slack gets its ack; the flow runs on the job queue workers
+    agent_name, input_text = parse_message(user_prompt)
+    # Root span of the request; it stays open through the queue wait and ends when the reply is final
+    span = open_span("slack.handle_message", user=user, agent=agent_name, channel=event.get("channel"))
+
+    async def job_fn():
+        with use_span(span):
+            await run_and_reply(event, say, agent_name, input_text)
+
+    job = job_queue.submit(job_fn, agent_name, user)
+    if job is None:
+        span.set(rejected=True)
+        end_span(span)
+        await say("🚦 Too many requests in progress, please try again in a minute.")
+        return
+
+    ahead = job_queue.position(job)
+    if ahead:
+        await say(f"⏳ Queued `{agent_name}` request ({ahead} ahead of you).")
 
 async def main():
+    AgentFactory.start_invalidation_listener()
+    job_queue.start()
+    serve_in_background()
     handler = AsyncSocketModeHandler(app, os.getenv("SLACK_APP_TOKEN"))
     await handler.start_async()
 
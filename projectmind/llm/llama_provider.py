@@ -1,5 +1,11 @@
+import copy
 import os
-from llama_cpp import Llama
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+import numpy as np
 from projectmind.models.chat_message import ChatMessage
 from projectmind.db.models.llm_model import LLMModel
 from projectmind.db.models.llm_config import LLMConfig
@@ -8,57 +14,193 @@ from loguru import logger
 
 load_llama_cpp_library()
 
-def _safe_bool(value: bool | None, default: bool = False) -> bool:
-    return default if value is None else value
+from projectmind.llm.model_pool import model_pool, model_pool_key, PooledModel
+from projectmind.llm.prompt_cache import prompt_state_cache
+from projectmind.llm.response_cache import response_cache, model_file_hash
+from projectmind.llm.scheduler import current_slot, inference_scheduler
+from projectmind.utils.tracing import open_span, end_span
+
+# Shorter shared prefixes are not worth a state snapshot.
+MIN_PREFIX_TOKENS = 32
+
+
+def _perf_counters(llm) -> tuple[float, int, float, int] | None:
+    """(prompt_eval_ms, prompt_eval_tokens, eval_ms, eval_tokens) accumulated by the llama.cpp context."""
+    try:
+        import llama_cpp
+        data = llama_cpp.llama_perf_context(llm._ctx.ctx)
+        return data.t_p_eval_ms, data.n_p_eval, data.t_eval_ms, data.n_eval
+    except Exception:
+        return None
+
+
+def _common_prefix_len(a: np.ndarray, b: np.ndarray) -> int:
+    n = min(len(a), len(b))
+    mismatches = np.flatnonzero(a[:n] != b[:n])
+    return int(mismatches[0]) if len(mismatches) else n
+
 
 class LlamaProvider:
     def __init__(self, config: LLMConfig, model: LLMModel):
         self.config = config
         self.model = model
+        self._entry = None
+        self._replicas: dict[int, PooledModel] = {}
+        # In-flight chat calls; a retired provider closes when the last one ends
+        self._uses = 0
+        self._retired = False
+        self._use_lock = threading.Lock()
 
         if model.provider != "llama":
             raise ValueError(f"❌ Invalid provider: {model.provider}")
         if not model.model or not os.path.isfile(model.model):
             raise FileNotFoundError(f"❌ Model file not found: {model.model}")
 
-        logger.info(f"🧠 Loading GGUF model: {os.path.basename(model.model)}")
-
-        self.llm = Llama(
-            model_path=model.model,
-            chat_format=model.chat_format or None,
-            n_ctx=model.n_ctx or 4096,
-            n_threads=model.n_threads or os.cpu_count(),
-            n_threads_batch=model.n_threads or os.cpu_count(),
-            n_batch=model.n_batch or 64,
-            n_ubatch=model.n_batch or 64,
-            use_mmap=_safe_bool(model.use_mmap, True),
-            use_mlock=_safe_bool(model.use_mlock, False),
-            numa=model.numa or 1,
-            rope_scaling_type=model.rope_scaling_type or 1,
-            f16_kv=_safe_bool(model.f16_kv),
-            low_vram=_safe_bool(model.low_vram),
-            offload_kqv=_safe_bool(model.offload_kqv),
-            embedding=_safe_bool(model.embedding),
-            logits_all=_safe_bool(model.logits_all),
-            verbose=_safe_bool(model.verbose),
-            mixture_of_experts=_safe_bool(getattr(model, "mixture_of_experts", False)),
-        )
+        # Weights are shared through the process-wide pool; only sampling params are per provider.
+        self._entry, self.from_pool = model_pool.acquire(model, slots=inference_scheduler.slots_for(model.name))
+        self.fingerprint = hashlib.sha1(repr(model_pool_key(model)).encode()).hexdigest()[:16]
+        # Load time not yet attributed to a run (reported once, by the first run that uses the context)
+        self._unreported_load_ms = 0.0 if self.from_pool else self._entry.load_ms
 
-        self.temperature = config.temperature or 0.7
+        # temperature 0 is a valid (greedy) setting, only fall back when unset
+        self.temperature = config.temperature if config.temperature is not None else 0.7
         self.max_tokens = config.max_tokens or 1024
         self.top_p = config.top_p or 1.0
         self.stop_tokens = config.stop_tokens or []
+        self.seed = getattr(config, "seed", None)
+
+    @property
+    def llm(self):
+        """
+        The primary llama.cpp context. A retired provider only gets it back inside a
+        call bracketed by _in_use() (chat_stream, tokenize, detokenize), which
+        releases it again; a plain read never pins the model in the pool.
+        """
+        entry = self._entry
+        if entry is None:
+            with self._use_lock:
+                in_use = self._uses > 0
+            if not in_use:
+                raise RuntimeError(f"❌ Provider for '{self.model.name}' was retired; use chat()/tokenize() instead of .llm")
+            entry = self._reacquire()
+        return entry.llm
+
+    @contextmanager
+    def _in_use(self):
+        """Counts a call on the model; a retired provider is closed when its last call ends."""
+        with self._use_lock:
+            self._uses += 1
+        try:
+            yield
+        finally:
+            with self._use_lock:
+                self._uses -= 1
+                release = self._retired and self._uses == 0
+            if release:
+                self.close()
 
-        for k, v in self.llm.metadata.items():
-            logger.debug(f"{k}: {v}")
+    def tokenize(self, text: str) -> list[int]:
+        """Token ids of `text` (no BOS, no special tokens) with the model's own tokenizer."""
+        with self._in_use():
+            return self.llm.tokenize(text.encode("utf-8"), add_bos=False, special=False)
+
+    def detokenize(self, tokens: list[int]) -> str:
+        with self._in_use():
+            return self.llm.detokenize(tokens).decode("utf-8", errors="ignore")
+
+    def _reacquire(self) -> PooledModel:
+        with self._use_lock:
+            if self._entry is None:
+                self._entry, _ = model_pool.acquire(self.model, slots=inference_scheduler.slots_for(self.model.name))
+            return self._entry
+
+    def retire(self):
+        """
+        Releases the provider once no call is using it (e.g. after its cached agent
+        was replaced). Agents still holding it keep working: a later call
+        re-acquires the model from the pool and releases it again when done.
+        """
+        with self._use_lock:
+            self._retired = True
+            idle = self._uses == 0
+        if idle:
+            self.close()
 
     @property
     def chat_template(self) -> str | None:
         return self.llm.metadata.get("tokenizer.chat_template")
 
-    def chat(self, messages: list[ChatMessage | dict]) -> str:
-        logger.debug("🗨️ Generating response using structured chat format")
+    def close(self):
+        """Returns the model to the pool. The provider must not be used afterwards."""
+        if self._entry is not None:
+            model_pool.release(self._entry)
+            self._entry = None
+        for entry in self._replicas.values():
+            model_pool.release(entry)
+        self._replicas.clear()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def _slot_entry(self) -> PooledModel:
+        """The pooled context for the scheduler slot running this call (slot 0 = the primary one)."""
+        slot = current_slot()
+        if slot == 0:
+            return self._entry or self._reacquire()
+        entry = self._replicas.get(slot)
+        if entry is None:
+            entry, was_cached = model_pool.acquire(
+                self.model, replica=slot, slots=inference_scheduler.slots_for(self.model.name)
+            )
+            if not was_cached:
+                self._unreported_load_ms += entry.load_ms
+            self._replicas[slot] = entry
+        return entry
+
+    def _prefix_key(self, prompt_key: tuple | None) -> tuple | None:
+        if not prompt_key or None in prompt_key:
+            return None
+        prompt_id, prompt_version = prompt_key
+        return (self.fingerprint, str(prompt_id), str(prompt_version))
+
+    def _restore_prefix(self, llm, key: tuple | None) -> bool:
+        """Loads the cached KV state for the prompt prefix. Caller must hold the model lock."""
+        if key is None:
+            return False
+        state = prompt_state_cache.get(key)
+        if state is None:
+            return False
+
+        # Skip the copy when the context already starts with this prefix (same agent back to back).
+        n = state.n_tokens
+        if llm.n_tokens < n or not np.array_equal(llm.input_ids[:n], state.input_ids[:n]):
+            llm.load_state(state)
+        logger.debug(f"♻️ Reusing {n} cached prefix tokens for prompt {key[1]}")
+        return True
 
+    def _store_prefix(self, llm, key: tuple | None, restored: bool):
+        """Learns and snapshots the stable prefix after a run. Caller must hold the model lock."""
+        if key is None or restored:
+            return
+
+        tokens = llm.input_ids.copy()
+        previous = prompt_state_cache.pop_tokens(key)
+        n = _common_prefix_len(previous, tokens) if previous is not None else 0
+        if n < MIN_PREFIX_TOKENS:
+            prompt_state_cache.remember_tokens(key, tokens)
+            return
+
+        # Snapshot through the public API and mark only the shared prefix (system prompt + header)
+        # as valid on the copy: load_state() plus the next eval drop the KV entries past n_tokens,
+        # while the live context keeps the full run for llama.cpp's own prefix reuse.
+        snapshot = copy.copy(llm.save_state())
+        snapshot.n_tokens = n
+        prompt_state_cache.put(key, snapshot)
+
+    def _format_messages(self, messages: list[ChatMessage | dict]) -> list[dict]:
         formatted_messages = [
             m.dict() if isinstance(m, ChatMessage) else ChatMessage(**m).dict()
             for m in messages
@@ -72,16 +214,149 @@ class LlamaProvider:
             "top_p": self.top_p,
             "stop_tokens": self.stop_tokens,
         })
+        return formatted_messages
 
+    def _response_key(self, formatted_messages: list[dict]) -> str | None:
+        """Content address of a deterministic completion, or None when the call must not be cached."""
+        if not response_cache.enabled or not response_cache.is_deterministic(self.temperature, self.seed):
+            return None
+        sampling = {
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "top_p": self.top_p,
+            "stop": self.stop_tokens,
+            "seed": self.seed,
+        }
+        return response_cache.make_key(
+            model_file_hash(self.model.model),
+            self.model.chat_format,
+            self.chat_template,
+            sampling,
+            formatted_messages,
+        )
+
+    @staticmethod
+    def _record_timings(stats: dict, llm, before, chunks: list[str], started: float, first_token_at: float | None, finished_at: float):
+        """Fills token counts and timings, preferring llama.cpp's own counters over wall-clock estimates."""
+        after = _perf_counters(llm)
+        if before is not None and after is not None:
+            stats["prompt_eval_ms"] = round(after[0] - before[0], 1)
+            stats["prompt_tokens"] = after[1] - before[1]
+            stats["generation_ms"] = round(after[2] - before[2], 1)
+            stats["completion_tokens"] = after[3] - before[3]
+        else:
+            first = first_token_at or finished_at
+            stats["prompt_eval_ms"] = round((first - started) * 1000, 1)
+            stats["prompt_tokens"] = None
+            stats["generation_ms"] = round((finished_at - first) * 1000, 1)
+            stats["completion_tokens"] = len(chunks)  # llama.cpp streams one token per chunk
+
+    def chat(
+        self,
+        messages: list[ChatMessage | dict],
+        prompt_key: tuple | None = None,
+        cancel_event: threading.Event | None = None,
+        stats: dict | None = None,
+    ) -> str:
+        """
+        Generates a full response. Tokens are pulled from the stream so that a set
+        cancel_event stops llama.cpp at the next token instead of after max_tokens.
+        Per-call details (e.g. response cache hits) are written into `stats` when given.
+        A failure is returned as "⚠️ Failed to generate response: ..." with stats["error"] set.
+        """
         try:
-            response = self.llm.create_chat_completion(
+            chunks = []
+            stream = self.chat_stream(messages, prompt_key=prompt_key, stats=stats)
+            try:
+                for delta in stream:
+                    if cancel_event is not None and cancel_event.is_set():
+                        logger.warning(f"🛑 Generation cancelled after {len(chunks)} chunks")
+                        break
+                    chunks.append(delta)
+            finally:
+                stream.close()
+            return "".join(chunks).strip()
+        except Exception as e:
+            logger.error(f"❌ Chat generation failed: {e}")
+            if stats is not None:
+                stats["error"] = str(e)
+            return f"⚠️ Failed to generate response: {str(e)}"
+
+    def chat_stream(
+        self,
+        messages: list[ChatMessage | dict],
+        prompt_key: tuple | None = None,
+        stats: dict | None = None,
+    ) -> Iterator[str]:
+        """
+        Yields content deltas as llama.cpp samples them. The model stays locked until the stream ends.
+
+        Deterministic calls (temperature 0 or a pinned seed) are served from the
+        response cache when it is enabled; a hit is yielded as a single delta.
+
+        `stats` receives prompt/completion token counts, ttft_ms, prompt_eval_ms,
+        generation_ms, model_load_ms and model_cache_hit for the call.
+        """
+        logger.debug("🗨️ Generating response using structured chat format")
+        started = time.perf_counter()
+        stats = stats if stats is not None else {}
+        span = open_span("llm.chat", model=self.model.name, slot=current_slot())
+        error = None
+        with self._in_use():
+            try:
+                yield from self._generate(messages, prompt_key, stats, started)
+            except GeneratorExit:
+                span.set(cancelled=True)
+                raise
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                span.set(**{k: v for k, v in stats.items() if v is not None})
+                end_span(span, error)
+
+    def _generate(self, messages: list[ChatMessage | dict], prompt_key: tuple | None, stats: dict, started: float) -> Iterator[str]:
+        formatted_messages = self._format_messages(messages)
+        response_key = self._response_key(formatted_messages)
+        stats["response_cache_hit"] = False
+        if response_key is not None:
+            cached = response_cache.get(response_key)
+            if cached is not None:
+                stats["response_cache_hit"] = True
+                yield cached
+                return
+
+        prefix_key = self._prefix_key(prompt_key)
+        entry = self._slot_entry()
+        load_ms, self._unreported_load_ms = self._unreported_load_ms, 0.0
+        stats["model_load_ms"] = round(load_ms, 1)
+        stats["model_cache_hit"] = load_ms == 0
+        chunks = []
+        first_token_at = None
+        with entry.lock:
+            restored = self._restore_prefix(entry.llm, prefix_key)
+            before = _perf_counters(entry.llm)
+            stream = entry.llm.create_chat_completion(
                 messages=formatted_messages,
                 temperature=self.temperature,
                 max_tokens=self.max_tokens,
                 top_p=self.top_p,
                 stop=self.stop_tokens or None,
+                seed=self.seed,
+                stream=True,
             )
-            return response["choices"][0]["message"]["content"].strip()
-        except Exception as e:
-            logger.error(f"❌ Chat generation failed: {e}")
-            return f"⚠️ Failed to generate response: {str(e)}"
+            for chunk in stream:
+                delta = chunk["choices"][0].get("delta", {}).get("content")
+                if delta:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                        stats["ttft_ms"] = round((first_token_at - started) * 1000, 1)
+                    chunks.append(delta)
+                    yield delta
+            finished_at = time.perf_counter()
+            self._record_timings(stats, entry.llm, before, chunks, started, first_token_at, finished_at)
+            self._store_prefix(entry.llm, prefix_key, restored)
+
+        # Only completed generations get here; a cancelled stream is closed before this point.
+        if response_key is not None:
+            response_cache.put(response_key, "".join(chunks))
@@ -0,0 +1,248 @@
+# projectmind/llm/model_pool.py
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from llama_cpp import Llama
+from loguru import logger
+from projectmind.db.models.llm_model import LLMModel
+
+
+def _safe_bool(value: bool | None, default: bool = False) -> bool:
+    return default if value is None else value
+
+
+def _max_pool_bytes() -> int | None:
+    """Reads the RAM budget for loaded models from LLAMA_POOL_MAX_MEMORY_GB (unset = unbounded)."""
+    raw = os.getenv("LLAMA_POOL_MAX_MEMORY_GB")
+    if not raw:
+        return None
+    return int(float(raw) * 1024 ** 3)
+
+
+def model_load_kwargs(model: LLMModel, slots: int = 1) -> dict:
+    """
+    Load-time llama.cpp parameters for an LLMModel row. Sampling params are NOT included.
+    The thread budget is split between the `slots` contexts that run the model at once.
+    """
+    n_threads = max(1, (model.n_threads or os.cpu_count() or 1) // max(slots, 1))
+    return dict(
+        model_path=model.model,
+        chat_format=model.chat_format or None,
+        n_ctx=model.n_ctx or 4096,
+        n_threads=n_threads,
+        n_threads_batch=n_threads,
+        n_batch=model.n_batch or 64,
+        n_ubatch=model.n_batch or 64,
+        use_mmap=_safe_bool(model.use_mmap, True),
+        use_mlock=_safe_bool(model.use_mlock, False),
+        numa=model.numa or 1,
+        rope_scaling_type=model.rope_scaling_type or 1,
+        f16_kv=_safe_bool(model.f16_kv),
+        low_vram=_safe_bool(model.low_vram),
+        offload_kqv=_safe_bool(model.offload_kqv),
+        embedding=_safe_bool(model.embedding),
+        logits_all=_safe_bool(model.logits_all),
+        verbose=_safe_bool(model.verbose),
+        mixture_of_experts=_safe_bool(getattr(model, "mixture_of_experts", False)),
+    )
+
+
+def kv_bytes_per_token(metadata: dict) -> int | None:
+    """
+    K and V cache bytes one token of context takes (f16 cache, llama.cpp's default),
+    from the GGUF metadata: 2 * layers * embedding width * (kv heads / heads) * 2 bytes.
+    """
+    arch = metadata.get("general.architecture")
+    try:
+        layers = int(metadata[f"{arch}.block_count"])
+        width = int(metadata[f"{arch}.embedding_length"])
+        heads = int(metadata.get(f"{arch}.attention.head_count", 1))
+        kv_heads = int(metadata.get(f"{arch}.attention.head_count_kv", heads))
+    except (KeyError, TypeError, ValueError):
+        return None
+    return 2 * layers * (width * kv_heads // max(heads, 1)) * 2
+
+
+def model_pool_key(model: LLMModel) -> tuple:
+    return tuple(sorted(model_load_kwargs(model).items()))
+
+
+@dataclass
+class PooledModel:
+    key: tuple
+    name: str
+    llm: Llama
+    size_bytes: int  # weights_bytes + context_bytes, what the budget is charged
+    load_ms: float
+    weights_bytes: int = 0
+    context_bytes: int = 0  # KV cache of this context (n_ctx tokens)
+    refcount: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+    # llama.cpp contexts are not thread-safe: every call on `llm` must hold this lock.
+    lock: threading.RLock = field(default_factory=threading.RLock)
+
+
+class ModelPool:
+    """
+    Process-wide pool of loaded llama.cpp models.
+
+    Models are keyed by their load-time parameters, so every agent whose LLMConfig
+    points to the same LLMModel shares one loaded instance. Entries are reference
+    counted; idle entries (refcount 0) are evicted in LRU order when loading a new
+    model would exceed the RAM budget.
+
+    Every context is charged its KV cache (n_ctx tokens); the weights are charged
+    once per file when mmap lets replicas share them, otherwise per context.
+    """
+
+    def __init__(self, max_bytes: int | None = None):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, PooledModel] = OrderedDict()
+        self._load_locks: dict[tuple, threading.Lock] = {}
+        self._kv_per_token: dict[str, int] = {}  # model path -> KV bytes per context token, learnt on first load
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def acquire(self, model: LLMModel, replica: int = 0, slots: int = 1) -> tuple[PooledModel, bool]:
+        """
+        Returns (entry, was_cached). Callers must pair it with release().
+
+        replica > 0 asks for an additional llama.cpp context of the same model,
+        used by the inference scheduler to run parallel sequences. `slots` is how
+        many contexts of the model run at once; a new context gets its share of
+        the model's threads so parallel slots do not oversubscribe the CPU.
+        """
+        key = model_pool_key(model)
+        if replica:
+            key += (("replica", replica),)
+
+        with self._lock:
+            entry = self._checkout(key)
+            if entry:
+                return entry, True
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Load outside the pool lock so other models stay available meanwhile;
+        # the per-key lock keeps two callers from loading the same file twice.
+        with load_lock:
+            with self._lock:
+                entry = self._checkout(key)
+                if entry:
+                    return entry, True
+
+            # With mmap, replicas share the weights' page cache; only the first context is charged for them.
+            weights_bytes = os.path.getsize(model.model) if not replica or not _safe_bool(model.use_mmap, True) else 0
+            n_ctx = model_load_kwargs(model)["n_ctx"]
+            with self._lock:
+                kv_per_token = self._kv_per_token.get(model.model)
+            self._make_room(weights_bytes + (kv_per_token or 0) * n_ctx)
+
+            logger.info(f"🧠 Loading GGUF model: {os.path.basename(model.model)}")
+            started = time.perf_counter()
+            llm = Llama(**model_load_kwargs(model, slots))
+            load_ms = (time.perf_counter() - started) * 1000
+
+            for k, v in llm.metadata.items():
+                logger.debug(f"{k}: {v}")
+
+            kv_per_token = kv_bytes_per_token(llm.metadata) or kv_per_token or 0
+            context_bytes = kv_per_token * llm.n_ctx()
+            name = f"{model.name}#{replica}" if replica else model.name
+            entry = PooledModel(
+                key=key, name=name, llm=llm, size_bytes=weights_bytes + context_bytes, load_ms=load_ms,
+                weights_bytes=weights_bytes, context_bytes=context_bytes,
+            )
+            with self._lock:
+                self._kv_per_token[model.model] = kv_per_token
+                self._entries[key] = entry
+                self._load_locks.pop(key, None)
+                self.loads += 1
+                entry.refcount += 1
+            logger.success(
+                f"📦 Model '{name}' loaded into pool in {load_ms:.0f} ms "
+                f"(KV cache {context_bytes / 1024 ** 2:.0f} MB)"
+            )
+            # The KV size is only known now; evict idle entries if the estimate fell short
+            self._make_room(0)
+            return entry, False
+
+    def release(self, entry: PooledModel):
+        with self._lock:
+            entry.refcount = max(entry.refcount - 1, 0)
+            entry.last_used = time.monotonic()
+
+    def evict_idle(self) -> int:
+        """Drops every model that no provider currently holds. Returns the number evicted."""
+        with self._lock:
+            idle = [k for k, e in self._entries.items() if e.refcount == 0]
+            victims = [self._entries.pop(k) for k in idle]
+        for entry in victims:
+            self._unload(entry)
+        return len(victims)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "models": [
+                    {
+                        "name": e.name, "refcount": e.refcount, "size_bytes": e.size_bytes,
+                        "weights_bytes": e.weights_bytes, "context_bytes": e.context_bytes,
+                    }
+                    for e in self._entries.values()
+                ],
+                "resident_bytes": sum(e.size_bytes for e in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+    def _checkout(self, key: tuple) -> PooledModel | None:
+        entry = self._entries.get(key)
+        if entry:
+            entry.refcount += 1
+            entry.last_used = time.monotonic()
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return entry
+
+    def _make_room(self, incoming_bytes: int):
+        if self.max_bytes is None:
+            return
+
+        victims = []
+        with self._lock:
+            resident = sum(e.size_bytes for e in self._entries.values())
+            for key, entry in list(self._entries.items()):  # oldest first
+                if resident + incoming_bytes <= self.max_bytes:
+                    break
+                if entry.refcount == 0:
+                    victims.append(self._entries.pop(key))
+                    resident -= entry.size_bytes
+
+        for entry in victims:
+            self._unload(entry)
+
+        if resident + incoming_bytes > self.max_bytes:
+            logger.warning(
+                f"⚠️ Model pool over budget: {(resident + incoming_bytes) / 1024 ** 3:.1f} GB "
+                f"> {self.max_bytes / 1024 ** 3:.1f} GB (all resident models are in use)"
+            )
+
+    def _unload(self, entry: PooledModel):
+        with entry.lock:
+            close = getattr(entry.llm, "close", None)
+            if close:
+                close()
+            entry.llm = None
+        with self._lock:
+            self.evictions += 1
+        logger.info(f"♻️ Evicted idle model '{entry.name}' from pool")
+
+
+model_pool = ModelPool(max_bytes=_max_pool_bytes())
@@ -0,0 +1,103 @@
+# projectmind/llm/prompt_cache.py
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any
+from loguru import logger
+
+
+def _state_size(state: Any) -> int:
+    size = getattr(state, "llama_state_size", None)
+    return size if size is not None else len(getattr(state, "llama_state", b""))
+
+
+class PromptStateCache:
+    """
+    LRU store of llama.cpp KV states for stable prompt prefixes.
+
+    Keys are (model_fingerprint, prompt_id, prompt_version). The prefix length is
+    learned: the first run of a key only records its token ids; the second run
+    keeps the longest common token prefix of both runs (system prompt + template
+    header) and a state snapshot whose n_tokens marks that prefix is cached. States are bounded in
+    memory by bytes and optionally persisted with diskcache.
+
+    This module deliberately avoids importing llama_cpp so the prompt manager
+    can invalidate entries without loading the native library.
+    """
+
+    def __init__(self, max_bytes: int, disk_dir: str | None = None):
+        self.max_bytes = max_bytes
+        self._states: OrderedDict[tuple, Any] = OrderedDict()
+        self._probes: dict[tuple, Any] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._disk = None
+        if disk_dir:
+            from diskcache import Cache
+            self._disk = Cache(disk_dir, tag_index=True)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Any | None:
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None:
+                self._states.move_to_end(key)
+                self.hits += 1
+                return state
+
+        if self._disk is not None:
+            state = self._disk.get(key)
+            if state is not None:
+                self._remember(key, state)
+                self.hits += 1
+                return state
+
+        self.misses += 1
+        return None
+
+    def put(self, key: tuple, state: Any):
+        self._remember(key, state)
+        if self._disk is not None:
+            self._disk.set(key, state, tag=key[1])
+        logger.debug(f"💾 Cached prompt prefix state for prompt {key[1]} v{key[2]} ({_state_size(state) / 1024 ** 2:.1f} MB)")
+
+    def remember_tokens(self, key: tuple, tokens: Any):
+        with self._lock:
+            self._probes[key] = tokens
+
+    def pop_tokens(self, key: tuple) -> Any | None:
+        with self._lock:
+            return self._probes.pop(key, None)
+
+    def invalidate_prompt(self, prompt_id: str):
+        """Drops every cached state (memory and disk) built from the given prompt row."""
+        with self._lock:
+            for key in [k for k in self._states if k[1] == prompt_id]:
+                self._bytes -= _state_size(self._states.pop(key))
+            for key in [k for k in self._probes if k[1] == prompt_id]:
+                del self._probes[key]
+        if self._disk is not None:
+            self._disk.evict(prompt_id)
+        logger.debug(f"🧹 Invalidated cached prompt states for prompt {prompt_id}")
+
+    def _remember(self, key: tuple, state: Any):
+        size = _state_size(state)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._states.pop(key, None)
+            if previous is not None:
+                self._bytes -= _state_size(previous)
+            self._states[key] = state
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._states.popitem(last=False)
+                self._bytes -= _state_size(evicted)
+
+
+prompt_state_cache = PromptStateCache(
+    max_bytes=int(float(os.getenv("LLAMA_PROMPT_CACHE_MAX_MB", "1024")) * 1024 ** 2),
+    disk_dir=os.getenv("LLAMA_PROMPT_CACHE_DIR") or None,
+)
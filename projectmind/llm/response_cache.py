@@ -0,0 +1,96 @@
+# projectmind/llm/response_cache.py
+
+import hashlib
+import json
+import os
+import threading
+from loguru import logger
+
+# Bytes hashed at each end of the GGUF file; hashing tens of GB per process start is not affordable
+_SAMPLE_BYTES = 4 * 1024 ** 2
+_file_hashes: dict[tuple, str] = {}
+_file_hash_lock = threading.Lock()
+
+
+def model_file_hash(path: str) -> str:
+    """
+    Content fingerprint of a model file: sha256 over size, mtime and the first
+    and last 4 MB (header, metadata and tail tensors). Cached per process.
+    """
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    with _file_hash_lock:
+        if key in _file_hashes:
+            return _file_hashes[key]
+
+    digest = hashlib.sha256(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+    with open(path, "rb") as f:
+        digest.update(f.read(_SAMPLE_BYTES))
+        if stat.st_size > 2 * _SAMPLE_BYTES:
+            f.seek(-_SAMPLE_BYTES, os.SEEK_END)
+            digest.update(f.read(_SAMPLE_BYTES))
+
+    with _file_hash_lock:
+        _file_hashes[key] = digest.hexdigest()
+    return _file_hashes[key]
+
+
+class ResponseCache:
+    """
+    Content-addressed store of chat completions, backed by diskcache.
+
+    Only deterministic calls are cached (temperature 0 or a pinned seed); the key
+    covers the model file, chat template/format, sampling params, seed and the
+    full message list. Opt-in via LLM_RESPONSE_CACHE_DIR; size-bounded by
+    LLM_RESPONSE_CACHE_MAX_MB with least-recently-used eviction.
+    """
+
+    def __init__(self, disk_dir: str | None, max_bytes: int):
+        self._disk = None
+        if disk_dir:
+            from diskcache import Cache
+            self._disk = Cache(disk_dir, size_limit=max_bytes, eviction_policy="least-recently-used")
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._disk is not None
+
+    @staticmethod
+    def is_deterministic(temperature: float, seed: int | None) -> bool:
+        return temperature == 0 or seed is not None
+
+    @staticmethod
+    def make_key(model_hash: str, chat_format: str | None, chat_template: str | None, sampling: dict, messages: list[dict]) -> str:
+        payload = json.dumps(
+            {
+                "model": model_hash,
+                "chat_format": chat_format,
+                "chat_template": chat_template,
+                "sampling": sampling,
+                "messages": messages,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        value = self._disk.get(key) if self._disk is not None else None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            logger.debug(f"🎯 Response cache hit {key[:12]}")
+        return value
+
+    def put(self, key: str, text: str):
+        if self._disk is not None:
+            self._disk.set(key, text)
+
+
+response_cache = ResponseCache(
+    disk_dir=os.getenv("LLM_RESPONSE_CACHE_DIR") or None,
+    max_bytes=int(float(os.getenv("LLM_RESPONSE_CACHE_MAX_MB", "512")) * 1024 ** 2),
+)
@@ -0,0 +1,157 @@
+# projectmind/llm/scheduler.py
+
+import asyncio
+import contextvars
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable
+from loguru import logger
+
+_slot = threading.local()
+
+
+def _parse_model_slots(raw: str | None) -> dict[str, int]:
+    """Parses LLAMA_MODEL_SLOTS, e.g. "wizardcoder-34b=1,mixtral=2"."""
+    slots = {}
+    for item in (raw or "").split(","):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            slots[name.strip()] = max(int(value), 1)
+    return slots
+
+
+def current_slot() -> int:
+    """Index of the scheduler slot running the current thread (0 outside the scheduler)."""
+    return getattr(_slot, "index", 0)
+
+
+@dataclass
+class InferenceJob:
+    fn: Callable[..., Any]
+    args: tuple
+    kwargs: dict
+    future: Future
+    # Caller's context (current trace span etc.), so the job runs as if called in place
+    context: contextvars.Context = field(default_factory=contextvars.copy_context)
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class ModelQueue:
+    """FIFO of inference jobs for one loaded model, drained by `slots` dedicated worker threads."""
+
+    def __init__(self, name: str, slots: int):
+        self.name = name
+        self.slots = slots
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_ms: deque[float] = deque(maxlen=1000)
+        self._jobs: queue.Queue[InferenceJob] = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers = [
+            threading.Thread(target=self._work, args=(i,), name=f"llm-{name}-{i}", daemon=True)
+            for i in range(slots)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def put(self, job: InferenceJob):
+        self._jobs.put(job)
+
+    def _work(self, index: int):
+        _slot.index = index
+        while True:
+            job = self._jobs.get()
+            if not job.future.set_running_or_notify_cancel():
+                continue  # cancelled while queued
+
+            wait_ms = (time.monotonic() - job.enqueued_at) * 1000
+            job.future.queue_wait_ms = wait_ms
+            with self._lock:
+                self.active += 1
+                self.wait_ms.append(wait_ms)
+
+            try:
+                job.future.set_result(job.context.run(job.fn, *job.args, **job.kwargs))
+                with self._lock:
+                    self.completed += 1
+            except BaseException as e:
+                job.future.set_exception(e)
+                with self._lock:
+                    self.failed += 1
+            finally:
+                with self._lock:
+                    self.active -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self.wait_ms)
+            return {
+                "queue_depth": self._jobs.qsize(),
+                "active": self.active,
+                "slots": self.slots,
+                "occupancy": self.active / self.slots,
+                "completed": self.completed,
+                "failed": self.failed,
+                "wait_ms_avg": sum(waits) / len(waits) if waits else 0.0,
+                "wait_ms_p95": waits[int(len(waits) * 0.95)] if waits else 0.0,
+            }
+
+
+class InferenceScheduler:
+    """
+    Routes inference calls to a per-model queue served by dedicated threads.
+
+    Callers get a Future back instead of blocking the event loop or spawning
+    one OS thread per request that then fights over the model lock. Each model
+    gets LLAMA_PARALLEL_SLOTS worker threads; slot N > 0 runs on its own
+    llama.cpp context (replica N in the model pool) over the same mmap'd
+    weights, so several sequences progress in parallel for a single model.
+    LLAMA_MODEL_SLOTS overrides the slot count per model name.
+
+    Each extra slot is a full context: it adds n_ctx tokens of KV cache to the
+    model's memory (charged against the pool budget), and the model's threads are
+    split between its slots instead of every context spinning all cores.
+    """
+
+    def __init__(self, slots: int = 1, model_slots: dict[str, int] | None = None):
+        self.slots = max(slots, 1)
+        self.model_slots = model_slots or {}
+        self._queues: dict[str, ModelQueue] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, llm, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """Queues fn(*args, **kwargs) behind the other requests for llm's model."""
+        with self._lock:
+            model_queue = self._queues.get(llm.fingerprint)
+            if model_queue is None:
+                slots = self.slots_for(llm.model.name)
+                model_queue = ModelQueue(llm.model.name, slots)
+                self._queues[llm.fingerprint] = model_queue
+                logger.info(f"🧵 Started {slots} inference slot(s) for model '{llm.model.name}'")
+
+        future: Future = Future()
+        model_queue.put(InferenceJob(fn=fn, args=args, kwargs=kwargs, future=future))
+        return future
+
+    def slots_for(self, model_name: str) -> int:
+        return self.model_slots.get(model_name, self.slots)
+
+    async def run(self, llm, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        return await asyncio.wrap_future(self.submit(llm, fn, *args, **kwargs))
+
+    def stats(self) -> dict[str, dict]:
+        with self._lock:
+            queues = list(self._queues.values())
+        return {q.name: q.stats() for q in queues}
+
+
+inference_scheduler = InferenceScheduler(
+    slots=int(os.getenv("LLAMA_PARALLEL_SLOTS", "1")),
+    model_slots=_parse_model_slots(os.getenv("LLAMA_MODEL_SLOTS")),
+)
@@ -0,0 +1,66 @@
+# projectmind/memory/embeddings.py
+
+import os
+import threading
+import numpy as np
+from loguru import logger
+from projectmind.db.models.llm_model import LLMModel
+
+EMBEDDING_DTYPE = np.float16
+
+
+def encode_embedding(vector: np.ndarray) -> bytes:
+    """Compact on-disk form: float16, already L2-normalized."""
+    return vector.astype(EMBEDDING_DTYPE).tobytes()
+
+
+def decode_embedding(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype=EMBEDDING_DTYPE)
+
+
+class Embedder:
+    """
+    Sentence embeddings from a local GGUF model, loaded through the shared model pool.
+
+    Configured with MEMORY_EMBEDDING_MODEL (path to the GGUF file); when it is
+    unset, semantic memory is disabled and callers fall back to recency.
+    """
+
+    def __init__(self, model_path: str | None):
+        self.model_path = model_path
+        self._entry = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.model_path)
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._entry is not None:
+                return
+            # Importing the provider loads the llama.cpp shared library first
+            from projectmind.llm.llama_provider import model_pool
+
+            model = LLMModel(
+                name=f"embedding:{os.path.basename(self.model_path)}",
+                provider="llama",
+                model=self.model_path,
+                n_ctx=int(os.getenv("MEMORY_EMBEDDING_N_CTX", "512")),
+                embedding=True,
+            )
+            self._entry, _ = model_pool.acquire(model)
+            logger.info(f"🧭 Embedding model ready: {model.name}")
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Returns an (n, dim) float32 matrix of L2-normalized embeddings."""
+        self._ensure_loaded()
+        with self._entry.lock:
+            vectors = self._entry.llm.embed(texts, normalize=True, truncate=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+    def embed_one(self, text: str) -> np.ndarray:
+        return self.embed([text])[0]
+
+
+embedder = Embedder(os.getenv("MEMORY_EMBEDDING_MODEL") or None)
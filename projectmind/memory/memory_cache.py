@@ -0,0 +1,155 @@
+# projectmind/memory/memory_cache.py
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from loguru import logger
+
+# Hit rates are logged every N lookups to help size MEMORY_CACHE_MAX_MB
+STATS_LOG_EVERY = 100
+
+# Seconds a scope is served from cache before it is re-read. Bounds how long memories written
+# or compacted by another process (task worker, compactor) stay invisible here.
+MEMORY_CACHE_TTL = float(os.getenv("MEMORY_CACHE_TTL", "60"))
+
+# Cached scope = (limit, [(is_summary, value), ...], loaded_at); summary first, newest raw items next
+Items = list[tuple[bool, str]]
+Entry = tuple[int, Items, float]
+
+
+def _entry_size(entry: Entry) -> int:
+    return sum(len(value.encode("utf-8")) for _, value in entry[1]) + 64 * (len(entry[1]) + 1)
+
+
+class MemoryCache:
+    """
+    Read-through cache for recency-ordered project memory, bounded by bytes.
+
+    Keys are (namespace, project, agent_name, task_type) scopes. Without
+    MEMORY_CACHE_DIR the store is an in-process LRU; with it, entries live in a
+    diskcache store shared by every process on the host (also byte-bounded).
+
+    Writes in this process update cached scopes in place; writes and deletes
+    made elsewhere become visible when the entry expires after `ttl` seconds
+    (write-through updates keep the original load time, so a busy scope is
+    still re-read from the database on schedule).
+    """
+
+    def __init__(self, max_bytes: int, disk_dir: str | None = None, ttl: float = MEMORY_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple, Entry] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._disk = None
+        if disk_dir:
+            from diskcache import Cache
+            self._disk = Cache(disk_dir, size_limit=max_bytes, eviction_policy="least-recently-used")
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, scope: tuple, limit: int) -> Items | None:
+        entry = self._load(scope)
+        # An entry cached for a smaller limit can only answer if it holds every item of the scope
+        hit = entry is not None and (entry[0] >= limit or len(entry[1]) < entry[0])
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            log = (self.hits + self.misses) % STATS_LOG_EVERY == 0
+        if log:
+            self.log_stats()
+        return entry[1][:limit] if hit else None
+
+    def put(self, scope: tuple, limit: int, items: Items):
+        self._store(scope, (limit, items[:limit], time.monotonic() if self._disk is None else time.time()))
+
+    def add_item(self, scope: tuple, value: str, is_summary: bool = False):
+        """Write-through for a newly committed memory. Uncached scopes are left alone."""
+        entry = self._load(scope)
+        if entry is None:
+            return
+        limit, items, loaded_at = entry
+        summaries = [item for item in items if item[0]]
+        recent = [item for item in items if not item[0]]
+        if is_summary:
+            summaries = [(True, value)]
+        else:
+            recent.insert(0, (False, value))
+        self._store(scope, (limit, (summaries + recent)[:limit], loaded_at))
+
+    def invalidate(self, scope: tuple):
+        if self._disk is not None:
+            self._disk.delete(scope)
+            return
+        with self._lock:
+            entry = self._entries.pop(scope, None)
+            if entry is not None:
+                self._bytes -= _entry_size(entry)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        if self._disk is not None:
+            entries, size = len(self._disk), self._disk.volume()
+        else:
+            entries, size = len(self._entries), self._bytes
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+    def log_stats(self):
+        stats = self.stats()
+        logger.info(
+            f"📊 Memory cache: {stats['hit_rate']:.0%} hit rate "
+            f"({stats['hits']} hits / {stats['misses']} misses), "
+            f"{stats['entries']} entries, {stats['bytes'] / 1024 ** 2:.1f} MB"
+        )
+
+    def _load(self, scope: tuple) -> Entry | None:
+        if self._disk is not None:
+            entry = self._disk.get(scope)  # expired by diskcache itself
+            return entry if entry is not None and len(entry) == 3 else None  # older entries carry no load time
+        with self._lock:
+            entry = self._entries.get(scope)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[2] >= self.ttl:
+                del self._entries[scope]
+                self._bytes -= _entry_size(entry)
+                return None
+            self._entries.move_to_end(scope)
+            return entry
+
+    def _store(self, scope: tuple, entry: Entry):
+        if self._disk is not None:
+            # Wall clock for the shared store; expiry counts from the original load
+            remaining = self.ttl - (time.time() - entry[2])
+            if remaining > 0:
+                self._disk.set(scope, entry, expire=remaining)
+            return
+
+        size = _entry_size(entry)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(scope, None)
+            if previous is not None:
+                self._bytes -= _entry_size(previous)
+            self._entries[scope] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= _entry_size(evicted)
+
+
+memory_cache = MemoryCache(
+    max_bytes=int(float(os.getenv("MEMORY_CACHE_MAX_MB", "64")) * 1024 ** 2),
+    disk_dir=os.getenv("MEMORY_CACHE_DIR") or None,
+)
@@ -0,0 +1,179 @@
+# projectmind/memory/memory_compactor.py
+
+import asyncio
+import hashlib
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from loguru import logger
+from sqlalchemy import delete, select
+
+from projectmind.db.models.memory import Memory
+from projectmind.db.session_async import AsyncSessionLocal
+from projectmind.memory.memory_manager import MemoryManager, SUMMARY_SUFFIX, forget_indexed, memory_key
+from projectmind.memory.memory_cache import memory_cache
+
+SUMMARIZER_AGENT = os.getenv("MEMORY_SUMMARIZER_AGENT", "summarizer")
+KEEP_RECENT = int(os.getenv("MEMORY_KEEP_RECENT", "5"))            # raw items always kept
+COMPACT_MIN_ITEMS = int(os.getenv("MEMORY_COMPACT_MIN_ITEMS", "10"))  # older items needed to trigger a summary
+RETENTION_DAYS = int(os.getenv("MEMORY_RETENTION_DAYS", "30"))      # older raw items are summarized regardless
+COMPACT_INTERVAL = int(os.getenv("MEMORY_COMPACT_INTERVAL", "3600"))
+NEAR_DUPLICATE_JACCARD = 0.9
+SHINGLE_SIZE = 5
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text.strip().lower())
+
+
+def _shingles(text: str) -> set[int]:
+    words = _normalize(text).split(" ")
+    if len(words) <= SHINGLE_SIZE:
+        return {hash(" ".join(words))}
+    return {hash(" ".join(words[i:i + SHINGLE_SIZE])) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def find_duplicates(rows: list[Memory]) -> list[Memory]:
+    """Rows (newest first) whose text repeats a newer row exactly or by shingle overlap."""
+    seen_hashes = set()
+    kept_shingles: list[set[int]] = []
+    duplicates = []
+
+    for row in rows:
+        digest = hashlib.sha256(_normalize(row.value).encode()).digest()
+        shingles = _shingles(row.value)
+        is_duplicate = digest in seen_hashes or any(
+            len(shingles & other) / max(len(shingles | other), 1) >= NEAR_DUPLICATE_JACCARD
+            for other in kept_shingles[-50:]
+        )
+        if is_duplicate:
+            duplicates.append(row)
+        else:
+            seen_hashes.add(digest)
+            kept_shingles.append(shingles)
+
+    return duplicates
+
+
+def build_summary_prompt(previous_summary: str | None, items: list[str]) -> str:
+    parts = [
+        "You maintain the long-term memory of an AI agent working on a software project.\n"
+        "Merge the previous summary and the new entries into one concise summary.\n"
+        "Keep decisions, requirements, names, file/module structure and open issues.\n"
+        "Drop repetition and chatter. Return only the summary.\n"
+    ]
+    if previous_summary:
+        parts.append(f"--- Previous summary ---\n{previous_summary.strip()}\n")
+    for i, item in enumerate(items, 1):
+        parts.append(f"--- Entry {i} ---\n{item.strip()}\n")
+    return "\n".join(parts)
+
+
+async def compact_scope(project_id, agent_name: str, task_type: str, namespace: str = "task_outputs") -> dict:
+    """
+    Compacts one (project, agent, task_type) scope:
+    drops exact/near duplicates, keeps the KEEP_RECENT newest raw items, and folds
+    older items (plus the previous summary) into a single summary row produced by
+    the summarizer agent.
+    """
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Memory)
+            .where(
+                Memory.namespace == namespace,
+                Memory.project_id == project_id,
+                Memory.agent_name == agent_name,
+                Memory.task_type == task_type,
+            )
+            .order_by(Memory.created_at.desc())
+        )
+        rows = result.scalars().all()
+
+    summaries = [r for r in rows if (r.key or "").endswith(SUMMARY_SUFFIX)]
+    raw = [r for r in rows if not (r.key or "").endswith(SUMMARY_SUFFIX)]
+
+    duplicates = find_duplicates(raw)
+    duplicate_ids = {r.id for r in duplicates}
+    unique = [r for r in raw if r.id not in duplicate_ids]
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=RETENTION_DAYS)
+    older = unique[KEEP_RECENT:]
+    expired = any(r.created_at and r.created_at < cutoff for r in older)
+    to_merge = older if (len(older) >= COMPACT_MIN_ITEMS or expired) else []
+
+    summary_text = None
+    if to_merge:
+        try:
+            from projectmind.agents.agent_factory import AgentFactory
+
+            summarizer = await AgentFactory.acreate(SUMMARIZER_AGENT)
+            previous = summaries[0].value if summaries else None
+            # Oldest first so the summary reads chronologically
+            prompt = build_summary_prompt(previous, [r.value for r in reversed(to_merge)])
+            summary_text = (await summarizer.arun(prompt)).strip()
+            if not summary_text or summary_text.startswith("⚠️"):
+                raise ValueError(f"summarizer returned no usable summary: {summary_text[:80]!r}")
+        except Exception as e:
+            logger.warning(f"⚠️ Memory summary skipped for {agent_name}:{task_type} in {project_id}: {e}")
+            to_merge, summary_text = [], None
+
+    removed = [r.id for r in duplicates] + [r.id for r in to_merge]
+    if summary_text:
+        removed += [r.id for r in summaries]
+    if not removed:
+        return {"deduplicated": 0, "summarized": 0}
+
+    manager = MemoryManager(namespace=namespace)
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            if summary_text:
+                await manager.save_project_context(
+                    project_id=project_id,
+                    project_name=rows[0].project_name,
+                    agent_name=agent_name,
+                    task_type=task_type,
+                    content=summary_text,
+                    session=session,
+                    commit=False,
+                    key=memory_key(agent_name, task_type, "summary"),
+                )
+            await session.execute(delete(Memory).where(Memory.id.in_(removed)))
+
+    for scope in manager.scope_keys(project_id, rows[0].project_name, agent_name, task_type):
+        memory_cache.invalidate(scope)
+    # Otherwise deleted ids keep taking top-k slots in semantic retrieval
+    forget_indexed(removed)
+
+    logger.success(
+        f"🗜️ Compacted {agent_name}:{task_type} in {project_id}: "
+        f"{len(duplicates)} duplicates removed, {len(to_merge)} items summarized"
+    )
+    return {"deduplicated": len(duplicates), "summarized": len(to_merge)}
+
+
+async def compact_all(namespace: str = "task_outputs"):
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Memory.project_id, Memory.agent_name, Memory.task_type)
+            .where(Memory.namespace == namespace, Memory.project_id.is_not(None))
+            .distinct()
+        )
+        scopes = result.tuples().all()
+
+    for project_id, agent_name, task_type in scopes:
+        try:
+            await compact_scope(project_id, agent_name, task_type, namespace)
+        except Exception as e:
+            logger.error(f"❌ Memory compaction failed for {agent_name}:{task_type} in {project_id}: {e}")
+
+
+async def run_loop():
+    logger.info("🔁 Starting memory compaction loop...")
+    while True:
+        await compact_all()
+        logger.info(f"⏳ Waiting {COMPACT_INTERVAL}s until next compaction cycle...")
+        await asyncio.sleep(COMPACT_INTERVAL)
+
+
+if __name__ == "__main__":
+    asyncio.run(run_loop())
@@ -1,7 +1,54 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from datetime import timedelta
 from loguru import logger
-from sqlalchemy import select, insert
+from sqlalchemy import event, select, insert, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from projectmind.db.models.memory import Memory
+from projectmind.db.models.project import Project
+from projectmind.memory.embeddings import embedder, encode_embedding
+from projectmind.memory.vector_index import VectorIndex
+from projectmind.memory.memory_cache import memory_cache
+
+# Scopes whose vector index is kept in memory; the least recently queried is dropped beyond this.
+MEMORY_INDEX_MAX_SCOPES = int(os.getenv("MEMORY_INDEX_MAX_SCOPES", "32"))
+# A warm index only reads rows created since its watermark minus this many seconds: created_at is
+# the inserting transaction's start, so a row can commit after rows with a later created_at.
+MEMORY_INDEX_SYNC_OVERLAP = float(os.getenv("MEMORY_INDEX_SYNC_OVERLAP", "300"))
+# Full id rescan of a warm scope, for rows deleted by other processes or committed past the overlap.
+MEMORY_INDEX_RESCAN_SECONDS = float(os.getenv("MEMORY_INDEX_RESCAN_SECONDS", "900"))
+
+# Per-scope vector indexes, shared by every MemoryManager in the process (LRU order)
+_indexes: OrderedDict[tuple, VectorIndex] = OrderedDict()
+
+
+def _index_for(key: tuple) -> VectorIndex:
+    index = _indexes.get(key)
+    if index is None:
+        index = _indexes[key] = VectorIndex()
+        while len(_indexes) > MEMORY_INDEX_MAX_SCOPES:
+            evicted, _ = _indexes.popitem(last=False)
+            logger.debug(f"🧭 Dropped vector index for {evicted}")
+    else:
+        _indexes.move_to_end(key)
+    return index
+
+SUMMARY_SUFFIX = ":summary"
+
+
+def forget_indexed(memory_ids) -> int:
+    """
+    Removes deleted memories from every vector index in this process. Ids are
+    unique, so broader scopes (e.g. all task types of an agent) are cleaned too.
+    """
+    memory_ids = set(memory_ids)
+    return sum(index.remove(memory_ids) for index in list(_indexes.values()))
+
+
+def memory_key(agent_name: str, task_type: str, kind: str = "last") -> str:
+    return f"{agent_name}:{task_type}:{kind}"
 
 
 class MemoryManager:
@@ -24,39 +71,127 @@ class MemoryManager:
             logger.error(f"❌ Memory get error: {e}")
             return None
 
+    def _scope(self, project_id, project_name, agent_name, task_type) -> list | None:
+        conditions = [Memory.namespace == self.namespace]
+
+        if project_id:
+            conditions.append(Memory.project_id == project_id)
+        elif project_name:
+            # Older rows only carry project_id, so resolve the name in the same query
+            project_ids = select(Project.id).where(Project.name == project_name)
+            conditions.append(or_(Memory.project_name == project_name, Memory.project_id.in_(project_ids)))
+        else:
+            return None
+
+        if agent_name:
+            conditions.append(Memory.agent_name == agent_name)
+        if task_type:
+            conditions.append(Memory.task_type == task_type)
+        return conditions
+
+    def scope_keys(self, project_id, project_name, agent_name, task_type) -> list[tuple]:
+        """Cache/index keys of a scope: one per way of addressing the project."""
+        keys = []
+        if project_id:
+            keys.append((self.namespace, f"id:{project_id}", agent_name, task_type))
+        if project_name:
+            keys.append((self.namespace, f"name:{project_name}", agent_name, task_type))
+        return keys
+
     async def get_project_context(
         self,
         project_id: str | None = None,
         project_name: str | None = None,
         agent_name: str = "",
         task_type: str = "",
-        session: AsyncSession = None
+        session: AsyncSession = None,
+        query: str | None = None,
+        top_k: int = 10
     ) -> list[str]:
-        try:
-            stmt = select(Memory).where(Memory.namespace == self.namespace)
+        """
+        Returns up to top_k memory values for the scope.
 
-            if project_id:
-                stmt = stmt.where(Memory.project_id == project_id)
-            elif project_name:
-                stmt = stmt.where(Memory.project_name == project_name)
-            else:
+        With a query and an embedding model configured, items are the most
+        similar memories (best first); otherwise the compacted summary of the
+        scope (if any) followed by the most recent items.
+        """
+        try:
+            conditions = self._scope(project_id, project_name, agent_name, task_type)
+            if conditions is None:
                 logger.warning("⚠️ No project_id or project_name provided for memory retrieval.")
                 return []
 
-            if agent_name:
-                stmt = stmt.where(Memory.agent_name == agent_name)
-            if task_type:
-                stmt = stmt.where(Memory.task_type == task_type)
+            if query and embedder.enabled:
+                key = self.scope_keys(project_id, project_name, agent_name, task_type)[0]
+                items = await self._semantic_context(conditions, key, query, top_k, session)
+                if items is not None:
+                    return items
+
+            scope = self.scope_keys(project_id, project_name, agent_name, task_type)[0]
+            cached = memory_cache.get(scope, top_k)
+            if cached is not None:
+                return [value for _, value in cached]
 
-            stmt = stmt.order_by(Memory.created_at.desc()).limit(10)
+            stmt = (
+                select(Memory.key, Memory.value)
+                .where(*conditions)
+                .order_by(Memory.key.endswith(SUMMARY_SUFFIX).desc().nulls_last(), Memory.created_at.desc())
+                .limit(top_k)
+            )
 
             result = await session.execute(stmt)
-            rows = result.scalars().all()
-            return [r.value for r in rows if r.value]
+            items = [((key or "").endswith(SUMMARY_SUFFIX), value) for key, value in result.tuples() if value]
+            memory_cache.put(scope, top_k, items)
+            return [value for _, value in items]
         except Exception as e:
             logger.error(f"❌ Memory get_project_context error: {e}")
             return []
 
+    async def _semantic_context(self, conditions, key, query, top_k, session) -> list[str] | None:
+        index = _index_for(key)
+        embedded = Memory.embedding.is_not(None)
+
+        # Synced while the query is embedded. A cold index loads the whole scope; a warm one only
+        # reads rows newer than its watermark (with overlap, add() skips known ids). Deletes reach
+        # it through forget_indexed() (compactor) and, from other processes, the periodic rescan.
+        embed = asyncio.to_thread(embedder.embed_one, query)
+        if not len(index):
+            query_vector, rows = await asyncio.gather(
+                embed, session.execute(select(Memory.id, Memory.embedding, Memory.created_at).where(*conditions, embedded))
+            )
+            rows = rows.tuples().all()
+            index.add_rows((memory_id, data) for memory_id, data, _ in rows)
+            index.mark_synced(max((created for _, _, created in rows if created), default=None), rescanned=True)
+        elif time.monotonic() - index.rescanned_at > MEMORY_INDEX_RESCAN_SECONDS:
+            query_vector, rows = await asyncio.gather(
+                embed, session.execute(select(Memory.id, Memory.created_at).where(*conditions, embedded))
+            )
+            rows = rows.tuples().all()
+            current, known = {memory_id for memory_id, _ in rows}, index.known_ids()
+            index.remove(known - current)
+            missing = current - known
+            if missing:
+                result = await session.execute(select(Memory.id, Memory.embedding).where(Memory.id.in_(missing)))
+                index.add_rows(result.tuples().all())
+            index.mark_synced(max((created for _, created in rows if created), default=None), rescanned=True)
+        else:
+            stmt = select(Memory.id, Memory.embedding, Memory.created_at).where(*conditions, embedded)
+            if index.synced_until is not None:
+                stmt = stmt.where(Memory.created_at >= index.synced_until - timedelta(seconds=MEMORY_INDEX_SYNC_OVERLAP))
+            query_vector, rows = await asyncio.gather(embed, session.execute(stmt))
+            rows = rows.tuples().all()
+            index.add_rows((memory_id, data) for memory_id, data, _ in rows)
+            index.mark_synced(max((created for _, _, created in rows if created), default=None))
+        if not len(index):
+            return None
+
+        hits = index.search(query_vector, top_k)
+        ids = [memory_id for memory_id, _ in hits]
+        result = await session.execute(select(Memory.id, Memory.value).where(Memory.id.in_(ids)))
+        values = dict(result.tuples().all())
+        logger.debug(f"🧭 Semantic memory: {len(hits)} hits out of {len(index)} indexed")
+        return [values[memory_id] for memory_id in ids if values.get(memory_id)]
+
     async def save_project_context(
         self,
         project_id: str | None = None,
@@ -64,7 +199,9 @@ class MemoryManager:
         agent_name: str = "",
         task_type: str = "",
         content: str = "",
-        session: AsyncSession = None
+        session: AsyncSession = None,
+        commit: bool = True,
+        key: str | None = None
     ):
         if content and len(content.strip()) > 20:
             try:
@@ -72,7 +209,7 @@ class MemoryManager:
                     namespace=self.namespace,
                     agent_name=agent_name,
                     task_type=task_type,
-                    key=f"{agent_name}:{task_type}:last",
+                    key=key or memory_key(agent_name, task_type),
                     value=content,
                 )
                 if project_id:
@@ -80,9 +217,24 @@ class MemoryManager:
                 if project_name:
                     values["project_name"] = project_name
 
-                stmt = insert(Memory).values(**values)
-                await session.execute(stmt)
-                await session.commit()
+                vector = None
+                if embedder.enabled:
+                    vector = await asyncio.to_thread(embedder.embed_one, content)
+                    values["embedding"] = encode_embedding(vector)
+
+                stmt = insert(Memory).values(**values).returning(Memory.id)
+                memory_id = (await session.execute(stmt)).scalar_one()
+
+                # Caches only see the row once it is committed (the caller may own the transaction)
+                def on_commit(_session):
+                    for scope in self.scope_keys(project_id, project_name, agent_name, task_type):
+                        memory_cache.add_item(scope, content, is_summary=values["key"].endswith(SUMMARY_SUFFIX))
+                        if vector is not None and scope in _indexes:
+                            _indexes[scope].add(memory_id, vector)
+
+                event.listen(session.sync_session, "after_commit", on_commit, once=True)
+                if commit:
+                    await session.commit()
 
                 proj_id_or_name = project_name or project_id or "unknown"
                 logger.success(
@@ -90,5 +242,7 @@ class MemoryManager:
                 )
             except Exception as e:
                 logger.error(f"❌ Memory save_project_context error: {e}")
+                if not commit:
+                    raise  # the caller owns the transaction and must roll back
         else:
             logger.info("📭 Output not valuable enough to store.")
@@ -0,0 +1,88 @@
+# projectmind/memory/vector_index.py
+
+import threading
+import time
+import numpy as np
+from projectmind.memory.embeddings import decode_embedding
+
+
+class VectorIndex:
+    """
+    In-memory exact cosine index for one (project, agent, task_type) scope.
+
+    Vectors are stored normalized in a float32 matrix that grows by doubling,
+    so a query is a single matrix-vector product plus argpartition. For 100k
+    memories of a few hundred dimensions that is a few milliseconds on CPU.
+    synced_until / rescanned_at record how far the owner has synced it with the
+    database (newest created_at read, monotonic time of the last full id scan).
+    """
+
+    def __init__(self):
+        self.ids: list = []
+        self._known: set = set()
+        self._matrix: np.ndarray | None = None
+        self._size = 0
+        self._lock = threading.Lock()
+        self.synced_until = None
+        self.rescanned_at = 0.0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def known_ids(self) -> set:
+        with self._lock:
+            return set(self._known)
+
+    def add(self, memory_id, vector: np.ndarray):
+        with self._lock:
+            if memory_id in self._known:
+                return
+            if self._matrix is None:
+                self._matrix = np.empty((64, vector.shape[0]), dtype=np.float32)
+            elif self._size == self._matrix.shape[0]:
+                grown = np.empty((self._size * 2, self._matrix.shape[1]), dtype=np.float32)
+                grown[: self._size] = self._matrix[: self._size]
+                self._matrix = grown
+            self._matrix[self._size] = vector
+            self.ids.append(memory_id)
+            self._known.add(memory_id)
+            self._size += 1
+
+    def remove(self, memory_ids) -> int:
+        """Drops ids from the index (e.g. rows deleted by the compactor); returns how many were indexed."""
+        with self._lock:
+            drop = self._known.intersection(memory_ids)
+            if not drop:
+                return 0
+            keep = [i for i, memory_id in enumerate(self.ids) if memory_id not in drop]
+            if keep:
+                self._matrix[: len(keep)] = self._matrix[keep]
+            self.ids = [self.ids[i] for i in keep]
+            self._known -= drop
+            self._size = len(keep)
+            return len(drop)
+
+    def mark_synced(self, newest, rescanned: bool = False):
+        """Advances the watermark to `newest` (a created_at, or None when no rows were read)."""
+        with self._lock:
+            if newest is not None and (self.synced_until is None or newest > self.synced_until):
+                self.synced_until = newest
+            if rescanned:
+                self.rescanned_at = time.monotonic()
+
+    def add_rows(self, rows):
+        """rows: iterable of (id, embedding_bytes); known ids are skipped before decoding."""
+        for memory_id, data in rows:
+            if memory_id not in self._known:
+                self.add(memory_id, decode_embedding(data).astype(np.float32))
+
+    def search(self, query: np.ndarray, top_k: int) -> list[tuple[object, float]]:
+        """Returns up to top_k (id, cosine similarity) pairs, best first."""
+        with self._lock:
+            if not self._size:
+                return []
+            scores = self._matrix[: self._size] @ query.astype(np.float32)
+            k = min(top_k, self._size)
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best])]
+            return [(self.ids[i], float(scores[i])) for i in best]
@@ -4,6 +4,8 @@ from sqlalchemy import select
 from projectmind.db.session_async import AsyncSessionLocal
 from projectmind.db.models import Agent
 from projectmind.optimization.optimizer_core import optimize_agent_prompt_and_config
+from projectmind.utils.metrics import push_metrics
+from projectmind.utils.slack_notifier import slack_notifier
 
 async def main():
     async with AsyncSessionLocal() as session:
@@ -16,5 +18,9 @@ async def main():
         except Exception as e:
             logger.error(f"❌ Failed to optimize {agent_row.name}: {e}")
 
+    # Notifications are delivered in the background; let them go out before exiting
+    await slack_notifier.close()
+    push_metrics("optimize_agent")
+
 if __name__ == "__main__":
     asyncio.run(main())
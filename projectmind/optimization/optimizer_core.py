@@ -27,7 +27,7 @@ def calculate_effectiveness(output: str) -> float:
 
 
 async def optimize_agent_prompt_and_config(agent_row):
-    agent = AgentFactory.create(agent_row.name)
+    agent = await AgentFactory.acreate(agent_row.name)
 
     async with AsyncSessionLocal() as session:
         result = await session.execute(
@@ -47,8 +47,9 @@ async def optimize_agent_prompt_and_config(agent_row):
 
         prompt_text = prompt_obj.system_prompt
 
+        llm_stats: dict = {}
         try:
-            output = agent.run(prompt_text)
+            output = await agent.arun(prompt_text, stats=llm_stats)
         except Exception as e:
             logger.error(f"❌ Error running agent '{agent.name}': {e}")
             return
@@ -75,7 +76,8 @@ async def optimize_agent_prompt_and_config(agent_row):
             },
             extra={
                 "prompt_id": str(prompt_obj.id),
-                "config_was_override": False
+                "config_was_override": False,
+                "response_cache_hit": llm_stats.get("response_cache_hit", False),
             }
         )
 
@@ -83,7 +85,7 @@ async def optimize_agent_prompt_and_config(agent_row):
 
         if is_output_weak(output) and agent_row.optimize_prompt:
             logger.info(f"🔧 Weak output detected for '{agent.name}', running optimization...")
-            optimizer = AgentFactory.create("prompt_optimizer")
+            optimizer = await AgentFactory.acreate("prompt_optimizer")
             reason = "Output was too short or repetitive."
 
             optimization_prompt = (
@@ -104,7 +106,7 @@ async def optimize_agent_prompt_and_config(agent_row):
             )
 
             try:
-                improved_prompt = optimizer.run(optimization_prompt)
+                improved_prompt = await optimizer.arun(optimization_prompt)
                 if not improved_prompt or "prompt" not in improved_prompt.lower():
                     logger.warning("⚠️ Optimized prompt looks invalid or too short, skipping update.")
                     return
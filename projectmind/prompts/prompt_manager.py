@@ -1,8 +1,10 @@
 # projectmind/prompts/prompt_manager.py
 
+import sys
 from loguru import logger
 from sqlalchemy import select
 from projectmind.db.models.prompt import Prompt
+from projectmind.llm.prompt_cache import prompt_state_cache
 
 class PromptManager:
     def __init__(self, session):
@@ -49,9 +51,17 @@ class PromptManager:
             is_active=True
         )
         old_prompt.is_active = False
+        # The flush hook in projectmind.db.invalidation notifies the other processes on commit
         self.session.add_all([old_prompt, new_prompt])
         await self.session.commit()
+        prompt_state_cache.invalidate_prompt(str(old_prompt.id))
+
+        # Only invalidate if this process has a factory cache (importing it would load llama.cpp)
+        factory_module = sys.modules.get("projectmind.agents.agent_factory")
+        if factory_module:
+            factory_module.AgentFactory.invalidate(old_prompt.agent_name)
         logger.info(f"✅ Registered new prompt version for '{old_prompt.agent_name}' → v{new_version}")
+        return new_prompt
 
     async def evaluate_and_optimize_if_needed(self, agent_row, system_prompt: str, user_prompt: str, response: str):
         from projectmind.utils.prompt_optimizer import maybe_optimize_prompt
@@ -1,52 +1,116 @@
 import re
 import string
+import uuid
 from uuid import UUID
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from projectmind.db.models.task import Task
 from loguru import logger
 
+BULLET_PATTERN = re.compile(r'^([ \t]*)[-*]\s+(.+)$', re.MULTILINE)
+# ``` or ~~~ fenced block up to its closing fence (or the end of an unterminated block)
+FENCED_CODE_PATTERN = re.compile(r'^[ \t]*(`{3,}|~{3,}).*?(?:^[ \t]*\1[ \t]*$|\Z)', re.MULTILINE | re.DOTALL)
+
 def normalize_task_name(name: str) -> str:
     name = name.strip().lower()
     return name.translate(str.maketrans('', '', string.punctuation))
 
+def parse_task_tree(output_text: str) -> list[tuple[str, str, str | None]]:
+    """
+    Extracts bullet tasks from an agent output.
+    Returns (task_name, description, parent_task_name) in order of appearance;
+    nested bullets point to the closest less-indented bullet above them.
+    Fenced code blocks are skipped, so list items inside code are never tasks.
+    """
+    parsed = []
+    stack: list[tuple[int, str]] = []  # (indent, task_name)
+    seen = set()
+
+    for match in BULLET_PATTERN.finditer(FENCED_CODE_PATTERN.sub("", output_text)):
+        indent = len(match.group(1).expandtabs(4))
+        task_desc = match.group(2).strip()
+        task_name = normalize_task_name(task_desc[:100])
+        if not task_name:
+            continue
+
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+        parent_name = stack[-1][1] if stack else None
+        stack.append((indent, task_name))
+
+        if task_name in seen:
+            continue
+        seen.add(task_name)
+        parsed.append((task_name, task_desc, parent_name))
+
+    return parsed
+
 async def save_tasks_from_output(
     project_id: UUID,
     agent_name: str,
     output_text: str,
-    session: AsyncSession
-):
-    tasks = re.findall(r'^-\s(.+)', output_text, re.MULTILINE)
-    saved = 0
+    session: AsyncSession,
+    commit: bool = True
+) -> list[UUID]:
+    """
+    Inserts every parsed task with a single INSERT ... ON CONFLICT DO NOTHING
+    on (project_id, agent_name, task_name) and returns the ids of the new rows.
+    Parent links of new subtasks are set with one bulk UPDATE afterwards.
+    """
+    parsed = parse_task_tree(output_text)
+    if not parsed:
+        return []
 
     try:
-        for task_desc in tasks:
-            task_name = normalize_task_name(task_desc[:100])
+        ids = {task_name: uuid.uuid4() for task_name, _, _ in parsed}
+        stmt = (
+            pg_insert(Task)
+            .values([
+                dict(
+                    id=ids[task_name],
+                    project_id=project_id,
+                    agent_name=agent_name,
+                    task_name=task_name,
+                    description=task_desc,
+                    status="pending",
+                )
+                for task_name, task_desc, _ in parsed
+            ])
+            .on_conflict_do_nothing(index_elements=[Task.project_id, Task.agent_name, Task.task_name])
+            .returning(Task.id, Task.task_name)
+        )
+        inserted = dict((await session.execute(stmt)).tuples().all())  # id -> task_name
+        new_names = set(inserted.values())
 
-            exists_query = select(Task).where(
-                Task.project_id == project_id,
-                Task.agent_name == agent_name,
-                Task.task_name == task_name,
+        # Parents that already existed keep their original id, so look those up in one query
+        children = [(name, parent) for name, _, parent in parsed if parent and name in new_names]
+        existing_parents = {parent for _, parent in children if parent not in new_names}
+        if existing_parents:
+            rows = await session.execute(
+                select(Task.task_name, Task.id).where(
+                    Task.project_id == project_id,
+                    Task.agent_name == agent_name,
+                    Task.task_name.in_(existing_parents),
+                )
             )
-            exists = await session.scalar(exists_query)
-
-            if exists:
-                logger.debug(f"Task already exists, skipping: {task_name}")
-                continue
-
-            task = Task(
-                project_id=project_id,
-                agent_name=agent_name,
-                task_name=task_name,
-                description=task_desc,
-                status="pending"
+            ids.update(dict(rows.tuples().all()))
+
+        if children:
+            await session.execute(
+                update(Task),
+                [{"id": ids[name], "parent_task_id": ids[parent]} for name, parent in children],
             )
-            session.add(task)
-            saved += 1
-        await session.commit()
-        logger.success(f"Saved {saved} new tasks for project {project_id} by agent {agent_name}")
+
+        if commit:
+            await session.commit()
+        else:
+            await session.flush()
+        logger.success(f"Saved {len(inserted)} new tasks for project {project_id} by agent {agent_name}")
+        return list(inserted)
 
     except Exception as e:
-        await session.rollback()
+        if commit:
+            await session.rollback()
         logger.error(f"Error saving tasks: {e}")
         raise
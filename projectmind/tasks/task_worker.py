@@ -0,0 +1,336 @@
+# projectmind/tasks/task_worker.py
+
+import asyncio
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+from uuid import UUID
+from loguru import logger
+from sqlalchemy import String, and_, cast, exists, func, or_, select, update
+from sqlalchemy.orm import aliased
+
+from projectmind.db.models.agent import Agent as AgentModel
+from projectmind.db.models.project import Project
+from projectmind.db.models.task import Task
+from projectmind.db.session_async import AsyncSessionLocal
+
+# Tasks a single worker process runs at once (inference is still bounded per model by the scheduler).
+TASK_WORKER_CONCURRENCY = int(os.getenv("TASK_WORKER_CONCURRENCY", "2"))
+# A claim expires after this many seconds without a heartbeat and the task becomes claimable again.
+TASK_LEASE_SECONDS = float(os.getenv("TASK_LEASE_SECONDS", "600"))
+TASK_MAX_ATTEMPTS = int(os.getenv("TASK_MAX_ATTEMPTS", "3"))
+TASK_POLL_INTERVAL = float(os.getenv("TASK_POLL_INTERVAL", "5"))
+TASK_DEFAULT_EXECUTOR = os.getenv("TASK_DEFAULT_EXECUTOR") or None
+
+
+def _claimable():
+    """Pending, or in progress under an expired lease (its owner died), with attempts left."""
+    return and_(
+        or_(
+            Task.status == "pending",
+            and_(Task.status == "in_progress", Task.lease_expires_at < func.now()),
+        ),
+        Task.attempts < TASK_MAX_ATTEMPTS,
+    )
+
+
+def _lease_values(owner: str, start_attempt: bool = True) -> dict:
+    """`start_attempt` counts the lease as an attempt; only do so when the task starts executing."""
+    values = {
+        "status": "in_progress",
+        "claimed_by": owner,
+        "lease_expires_at": func.now() + timedelta(seconds=TASK_LEASE_SECONDS),
+    }
+    if start_attempt:
+        values["attempts"] = Task.attempts + 1
+    return values
+
+
+def _dependencies_completed():
+    """
+    The task's parent and every entry of Task.dependencies (task ids or names in
+    the same project, comma/semicolon/newline separated, as pipeline_from_tasks
+    reads them) are completed.
+    """
+    parent = aliased(Task)
+    blocker = aliased(Task)
+    dep = func.regexp_split_to_table(func.coalesce(Task.dependencies, ""), r"[,;\n]").table_valued(
+        "name", name="dep", joins_implicitly=True
+    )
+    dep_name = func.trim(dep.c.name)
+    return and_(
+        ~exists().where(parent.id == Task.parent_task_id, parent.status != "completed"),
+        ~exists(
+            select(blocker.id)
+            .select_from(dep)
+            .join(blocker, and_(
+                blocker.project_id == Task.project_id,
+                or_(cast(blocker.id, String) == dep_name, blocker.task_name == dep_name),
+            ))
+            .where(blocker.id != Task.id, blocker.status != "completed")
+        ),
+    )
+
+
+async def claim_tasks(task_ids: list[UUID], owner: str) -> set[UUID]:
+    """
+    Leases the given tasks to `owner` (e.g. a pipeline run) with the same rules as
+    TaskWorker.claim, so a worker never picks them up meanwhile. Tasks `owner`
+    already holds are re-leased. Leasing does not count as an attempt (a pipeline
+    may hold tasks it never gets to run); call start_attempt() when one starts.
+    Returns the ids that are now held by `owner`.
+    """
+    stmt = (
+        update(Task)
+        .where(Task.id.in_(task_ids), or_(_claimable(), and_(Task.status == "in_progress", Task.claimed_by == owner)))
+        .values(**_lease_values(owner, start_attempt=False))
+        .returning(Task.id)
+    )
+    async with AsyncSessionLocal() as session:
+        claimed = set((await session.execute(stmt)).scalars().all())
+        await session.commit()
+    return claimed
+
+
+async def start_attempt(task_id: UUID, owner: str) -> bool:
+    """Counts an attempt on a task leased with claim_tasks() as it starts executing."""
+    return await set_owned(task_id, owner, attempts=Task.attempts + 1)
+
+
+async def set_owned(task_id: UUID, owner: str, **values) -> bool:
+    """Updates a task `owner` still holds. Returns False when the lease was lost."""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            update(Task).where(Task.id == task_id, Task.claimed_by == owner).values(**values)
+        )
+        await session.commit()
+    return result.rowcount == 1
+
+
+async def renew_leases(owner: str) -> int:
+    """Extends every lease `owner` holds; returns how many were renewed."""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            update(Task)
+            .where(Task.status == "in_progress", Task.claimed_by == owner)
+            .values(lease_expires_at=func.now() + timedelta(seconds=TASK_LEASE_SECONDS))
+        )
+        await session.commit()
+    return result.rowcount
+
+
+async def release_tasks(owner: str) -> int:
+    """Hands every task `owner` still holds back to the queue (e.g. after a failed pipeline run)."""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            update(Task)
+            .where(Task.status == "in_progress", Task.claimed_by == owner)
+            .values(status="pending", claimed_by=None, lease_expires_at=None)
+        )
+        await session.commit()
+    return result.rowcount
+
+
+@dataclass
+class ClaimedTask:
+    id: UUID
+    project_id: UUID | None
+    task_name: str | None
+    description: str
+    assigned_agent: str | None
+    attempts: int
+    project_name: str | None = None
+
+
+class TaskRouter:
+    """
+    Picks the agent that executes a task among the agents with can_execute_tasks.
+
+    An explicit Task.assigned_agent wins; otherwise the first executor whose name
+    prefix or type (e.g. "backend" for backend_generator) appears in the task text;
+    otherwise TASK_DEFAULT_EXECUTOR, falling back to the first executor.
+    """
+
+    def __init__(self, executors: list[AgentModel], default: str | None = None):
+        self.names = [a.name for a in executors]
+        self.keywords = [
+            (a.name, {a.name.lower(), a.name.split("_")[0].lower(), (a.type or "").lower()} - {""})
+            for a in executors
+        ]
+        self.default = default if default in self.names else (self.names[0] if self.names else None)
+
+    def route(self, task: ClaimedTask) -> str | None:
+        if task.assigned_agent in self.names:
+            return task.assigned_agent
+        text = f"{task.task_name or ''} {task.description}".lower()
+        for name, keywords in self.keywords:
+            if any(k in text for k in keywords):
+                return name
+        return self.default
+
+
+async def load_executors() -> list[AgentModel]:
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(AgentModel)
+            .where(AgentModel.is_active == True, AgentModel.can_execute_tasks == True)
+            .order_by(AgentModel.name)
+        )
+        return list(result.scalars().all())
+
+
+class TaskWorker:
+    """
+    Claims pending tasks and runs them through the agent flow.
+
+    Claims use SELECT ... FOR UPDATE SKIP LOCKED inside a single UPDATE, so any
+    number of workers on any number of machines can poll the same database
+    without handing one task to two of them. A claim is a lease: the worker
+    extends it while the task runs, and a task whose lease expired (crashed
+    worker) is claimed again until TASK_MAX_ATTEMPTS is reached. Every status
+    change is fenced on claimed_by, so a worker that lost its lease cannot
+    overwrite the new owner's result.
+
+    A task is ready once its parent task and the tasks listed in its
+    dependencies are completed. Tasks leased by a pipeline run (claim_tasks)
+    are skipped like any other claimed task.
+    """
+
+    def __init__(self, concurrency: int = TASK_WORKER_CONCURRENCY, worker_id: str | None = None):
+        self.concurrency = max(concurrency, 1)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.router: TaskRouter | None = None
+        self._running: set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+        self.completed = 0
+        self.failed = 0
+
+    def stop(self):
+        self._stopping.set()
+
+    async def run(self):
+        executors = await load_executors()
+        if not executors:
+            logger.warning("⚠️ No active agents with can_execute_tasks; task worker not started")
+            return
+        self.router = TaskRouter(executors, TASK_DEFAULT_EXECUTOR)
+        logger.info(f"🛠️ Task worker {self.worker_id} started ({self.concurrency} slots, executors: {self.router.names})")
+
+        while not self._stopping.is_set():
+            free = self.concurrency - len(self._running)
+            if free > 0:
+                await self._reap_expired()
+                for task in await self.claim(free):
+                    job = asyncio.create_task(self._execute(task))
+                    self._running.add(job)
+                    job.add_done_callback(self._running.discard)
+
+            # Either every slot is busy or the queue is drained: wait for a slot or the next poll
+            if self._running:
+                await asyncio.wait(self._running, timeout=TASK_POLL_INTERVAL, return_when=asyncio.FIRST_COMPLETED)
+            else:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), TASK_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+
+        if self._running:
+            logger.info(f"⏳ Waiting for {len(self._running)} running task(s) before exit")
+            await asyncio.gather(*self._running, return_exceptions=True)
+        logger.info(f"👋 Task worker {self.worker_id} stopped ({self.completed} completed, {self.failed} failed)")
+
+    async def claim(self, limit: int) -> list[ClaimedTask]:
+        """Atomically moves up to `limit` ready tasks to in_progress under this worker's lease."""
+        candidates = (
+            select(Task.id)
+            .where(
+                _claimable(),
+                or_(Task.assigned_agent.is_(None), Task.assigned_agent.in_(self.router.names)),
+                _dependencies_completed(),
+            )
+            .order_by(Task.created_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True, of=Task)
+            .cte("candidates")
+        )
+        stmt = (
+            update(Task)
+            .where(Task.id.in_(select(candidates.c.id)))
+            .values(**_lease_values(self.worker_id))
+            .returning(Task.id, Task.project_id, Task.task_name, Task.description, Task.assigned_agent, Task.attempts)
+        )
+
+        async with AsyncSessionLocal() as session:
+            async with session.begin():
+                claimed = [ClaimedTask(*row) for row in (await session.execute(stmt)).all()]
+                project_ids = {t.project_id for t in claimed if t.project_id}
+                if project_ids:
+                    names = dict((await session.execute(
+                        select(Project.id, Project.name).where(Project.id.in_(project_ids))
+                    )).tuples().all())
+                    for task in claimed:
+                        task.project_name = names.get(task.project_id)
+
+        if claimed:
+            logger.info(f"📥 Claimed {len(claimed)} task(s)")
+        return claimed
+
+    async def _reap_expired(self):
+        """Fails tasks whose lease expired on their last allowed attempt."""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                update(Task)
+                .where(
+                    Task.status == "in_progress",
+                    Task.lease_expires_at < func.now(),
+                    Task.attempts >= TASK_MAX_ATTEMPTS,
+                )
+                .values(status="failed", claimed_by=None, lease_expires_at=None)
+            )
+            await session.commit()
+        if result.rowcount:
+            logger.warning(f"💀 Marked {result.rowcount} abandoned task(s) as failed")
+
+    async def _set(self, task_id: UUID, **values) -> bool:
+        """Updates a task this worker still owns. Returns False when the lease was lost."""
+        return await set_owned(task_id, self.worker_id, **values)
+
+    async def _heartbeat(self, task_id: UUID):
+        while True:
+            await asyncio.sleep(TASK_LEASE_SECONDS / 3)
+            if not await self._set(task_id, lease_expires_at=func.now() + timedelta(seconds=TASK_LEASE_SECONDS)):
+                logger.warning(f"⚠️ Lost lease on task {task_id}")
+                return
+
+    async def _execute(self, task: ClaimedTask):
+        # Imported lazily so that claiming does not pull in llama.cpp for tooling that only inspects tasks.
+        from projectmind.workflows.flow_builder import run_agent_flow
+
+        agent_name = self.router.route(task)
+        started = time.perf_counter()
+        heartbeat = asyncio.create_task(self._heartbeat(task.id))
+        try:
+            logger.info(f"▶️ Task '{task.task_name}' → agent '{agent_name}' (attempt {task.attempts})")
+            result = await run_agent_flow({
+                "agent_name": agent_name,
+                "input": f"Task: {task.task_name or ''}\n{task.description}",
+                "project_name": task.project_name,
+            }, thread_id=f"task-{task.id}-{task.attempts}")
+
+            done = await self._set(
+                task.id, status="completed", run_id=int(result["run_id"]),
+                claimed_by=None, lease_expires_at=None,
+            )
+            if done:
+                self.completed += 1
+                logger.success(f"✅ Task '{task.task_name}' completed in {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            status = "pending" if task.attempts < TASK_MAX_ATTEMPTS else "failed"
+            await self._set(task.id, status=status, claimed_by=None, lease_expires_at=None)
+            self.failed += 1
+            logger.error(f"❌ Task '{task.task_name}' failed (attempt {task.attempts}, now {status}): {e}")
+        finally:
+            heartbeat.cancel()
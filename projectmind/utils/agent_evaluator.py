@@ -7,7 +7,7 @@ async def evaluate_effectiveness_score(system_prompt: str, user_prompt: str, res
         logger.warning("⚠️ Skipping evaluation: agent response is empty.")
         return 1  # peor puntaje posible
 
-    agent = AgentFactory.create("prompt_evaluator")
+    agent = await AgentFactory.acreate("prompt_evaluator")
 
     eval_prompt = (
         "You are an evaluator. Your job is to rate how well an AI agent's response fulfills the user request.\n\n"
@@ -19,7 +19,7 @@ async def evaluate_effectiveness_score(system_prompt: str, user_prompt: str, res
     )
 
     logger.debug("🧪 Evaluating effectiveness using prompt_evaluator...")
-    score_raw = agent.run(eval_prompt).strip()
+    score_raw = (await agent.arun(eval_prompt)).strip()
     logger.debug(f"🔢 Raw score response: {score_raw}")
 
     match = re.search(r"\b([1-9]|10)\b", score_raw)
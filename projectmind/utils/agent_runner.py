@@ -2,8 +2,8 @@ from projectmind.agents.agent_factory import AgentFactory
 
 
 async def run_agent_once(agent_name: str, user_prompt: str, return_full_info: bool = False):
-    agent = await AgentFactory.create(agent_name)
-    response = await agent.arun(input)
+    agent = await AgentFactory.acreate(agent_name)
+    response = await agent.arun(user_prompt)
 
     if return_full_info:
         return {
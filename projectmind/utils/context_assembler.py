@@ -0,0 +1,105 @@
+# projectmind/utils/context_assembler.py
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from loguru import logger
+
+# Chat template tokens (role headers, BOS/EOS) not covered by the texts themselves
+TEMPLATE_OVERHEAD_TOKENS = 64
+# Below this, a truncated memory item is more noise than signal
+MIN_ITEM_TOKENS = 48
+SEPARATOR = "\n\n"
+
+
+class TokenCounter:
+    """LRU cache of token counts per (model, text), using the model's own tokenizer."""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._counts: OrderedDict[tuple, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def tokenize(self, llm, text: str) -> list[int]:
+        return llm.tokenize(text)
+
+    def count(self, llm, text: str) -> int:
+        if not text:
+            return 0
+        key = (llm.fingerprint, hashlib.sha1(text.encode("utf-8")).digest())
+        with self._lock:
+            if key in self._counts:
+                self._counts.move_to_end(key)
+                return self._counts[key]
+
+        n = len(self.tokenize(llm, text))
+        with self._lock:
+            self._counts[key] = n
+            if len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+        return n
+
+
+token_counter = TokenCounter()
+
+
+@dataclass
+class AssembledContext:
+    context: str
+    token_counts: dict = field(default_factory=dict)
+
+
+def assemble_context(llm, system_prompt: str, user_input: str, items: list[str]) -> AssembledContext:
+    """
+    Fits ranked memory items into what is left of the model context.
+
+    The window (LLMModel.n_ctx) is split between generation (LLMConfig.max_tokens),
+    the system prompt, the user input and template overhead; memory gets the rest.
+    Items are taken in the given order (most relevant/recent first) and the first
+    one that does not fit is truncated if enough room remains.
+    """
+    n_ctx = llm.model.n_ctx or 4096
+    generation = llm.max_tokens
+    system_tokens = token_counter.count(llm, system_prompt or "")
+    input_tokens = token_counter.count(llm, user_input or "")
+    separator_tokens = token_counter.count(llm, SEPARATOR)
+
+    budget = n_ctx - generation - system_tokens - input_tokens - TEMPLATE_OVERHEAD_TOKENS
+    remaining = budget
+    selected = []
+    dropped = 0
+
+    for item in items:
+        cost = token_counter.count(llm, item) + separator_tokens
+        if cost <= remaining:
+            selected.append(item)
+            remaining -= cost
+            continue
+
+        if remaining - separator_tokens >= MIN_ITEM_TOKENS:
+            tokens = token_counter.tokenize(llm, item)[: remaining - separator_tokens]
+            selected.append(llm.detokenize(tokens))
+            remaining = 0
+        dropped += len(items) - len(selected)
+        break
+
+    if budget < 0:
+        logger.warning(f"⚠️ Prompt exceeds the context window by {-budget} tokens before adding memory")
+    elif dropped:
+        logger.debug(f"✂️ Context budget {budget} tokens: kept {len(selected)} memory items, dropped {dropped}")
+
+    memory_tokens = budget - remaining if selected else 0
+    return AssembledContext(
+        context=SEPARATOR.join(selected),
+        token_counts={
+            "n_ctx": n_ctx,
+            "generation": generation,
+            "system": system_tokens,
+            "input": input_tokens,
+            "memory": memory_tokens,
+            "memory_budget": max(budget, 0),
+            "memory_items": len(selected),
+            "memory_items_dropped": dropped,
+        },
+    )
@@ -2,32 +2,48 @@ from projectmind.memory.memory_manager import MemoryManager
 from loguru import logger
 
 
-async def load_context(session, agent_row, agent, project, agent_name):
-    if not (project and agent.definition.type and agent_row.use_memory):
-        return ""
+async def load_context_items(session, agent_row, agent, project, agent_name, project_name=None, query=None) -> list[str]:
+    """Memory items for the agent, most relevant (or most recent) first."""
+    if not ((project or project_name) and agent.definition.type and agent_row.use_memory):
+        return []
     memory = MemoryManager(namespace="task_outputs")
     context_items = await memory.get_project_context(
-        project_id=project.id,
+        project_id=project.id if project else None,
+        project_name=project_name,
         agent_name=agent_name,
         task_type=agent.definition.type,
-        session=session
+        session=session,
+        query=query
     )
     logger.debug(f"📚 Retrieved {len(context_items)} context items")
+    return context_items
+
+
+async def load_context(session, agent_row, agent, project, agent_name, project_name=None, query=None):
+    context_items = await load_context_items(session, agent_row, agent, project, agent_name, project_name, query)
     return "\n\n".join(context_items) if context_items else ""
 
 
-async def save_context(session, agent_row, agent, project, agent_name, output):
+async def save_context(session, agent_row, agent, project, agent_name, output, commit=True):
     if not (project and agent.definition.type and agent_row.use_memory):
         return
     try:
         memory = MemoryManager(namespace="task_outputs")
-        await memory.save_project_context(
+        save = memory.save_project_context(
             project_id=project.id,
+            project_name=project.name,
             agent_name=agent_name,
             task_type=agent.definition.type,
             content=output,
-            session=session
+            session=session,
+            commit=commit
         )
+        if commit:
+            await save
+        else:
+            # Inside the caller's transaction: isolate failures in a savepoint
+            async with session.begin_nested():
+                await save
         logger.success("🧠 Project memory stored")
     except Exception as e:
         logger.error(f"❌ Error saving project memory: {e}")
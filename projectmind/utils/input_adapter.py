@@ -1,10 +1,9 @@
 # projectmind/utils/input_adapter.py
 
-from langdetect import detect
 from loguru import logger
 from typing import Tuple
 
-from projectmind.agents.agent_factory import AgentFactory
+from projectmind.utils.language_utils import translate_to_english
 
 async def adapt_input_for_agent(input_text: str, agent_name: str) -> Tuple[str, str, bool]:
     """
@@ -12,23 +11,9 @@ async def adapt_input_for_agent(input_text: str, agent_name: str) -> Tuple[str,
     Returns: (adapted_input, original_input, was_translated)
     """
     original_input = input_text
-    lang = detect(input_text)
-    was_translated = False
+    input_text, was_translated = await translate_to_english(input_text, agent_name)
 
-    if lang != "en":
-        logger.info(f"🌐 Detected language '{lang}' — translating input for agent '{agent_name}'")
-
-        translator = AgentFactory.create("translator")
-        translation_prompt = (
-            f"You are a professional translator and assistant.
-             Translate and adapt the following request into clear, technical English, ready to be interpreted by an AI agent named '{agent_name}'.
-             Maintain the intent and clarify ambiguities if needed.
-             
-             Original input:
-             {input_text}"
-        )
-
-        input_text = translator.run(translation_prompt)
-        was_translated = True
+    if was_translated:
+        logger.info(f"🌐 Input translated for agent '{agent_name}'")
 
     return input_text.strip(), original_input.strip(), was_translated
@@ -1,16 +1,199 @@
 # projectmind/utils/language_utils.py
 
-from langdetect import detect
-from deep_translator import GoogleTranslator
+import asyncio
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from loguru import logger
+
+# Agent used for local translation (runs on llama.cpp like every other agent).
+TRANSLATOR_AGENT = os.getenv("TRANSLATOR_AGENT", "translator")
+# Upper bound for a local translation in seconds; on expiry the original text is used.
+TRANSLATION_TIMEOUT = float(os.getenv("TRANSLATION_TIMEOUT", "30"))
+# Google Translate is only used as a fallback when explicitly allowed.
+TRANSLATION_ALLOW_REMOTE = os.getenv("TRANSLATION_ALLOW_REMOTE", "0") == "1"
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "2048"))
+TRANSLATION_CACHE_DIR = os.getenv("TRANSLATION_CACHE_DIR") or None
+
+# Enough common English words in plain ASCII text settles it without langdetect. Only words
+# that are not also short Spanish/Portuguese/French/Italian words ("a", "e", "o", "in", "on"...).
+_WORD = re.compile(r"[a-z']+")
+_ENGLISH_MARKERS = frozenset(
+    "the and of with is are be it this that you we they what how why which should would "
+    "please create build make add write using from for into about".split()
+)
+# Below this many words the fast path does not decide; langdetect does
+_MIN_WORDS = 4
+_MIN_MARKER_RATIO = 0.25
+
+_detector_lock = threading.Lock()
+_detector_ready = False
+
+
+def _init_detector():
+    """Loads langdetect's profiles once and pins its seed so results are deterministic."""
+    global _detector_ready
+    with _detector_lock:
+        if not _detector_ready:
+            from langdetect import DetectorFactory
+            from langdetect.detector_factory import init_factory
+
+            DetectorFactory.seed = 0
+            init_factory()
+            _detector_ready = True
+
+
+def _looks_english(text: str) -> bool:
+    if not text.isascii():
+        return False
+    words = _WORD.findall(text.lower())
+    if not words:
+        return True  # code, numbers, punctuation: nothing to translate
+    if len(words) < _MIN_WORDS:
+        return False
+    hits = sum(1 for w in words if w in _ENGLISH_MARKERS)
+    return hits >= 2 and hits / len(words) >= _MIN_MARKER_RATIO
+
+
+def detect_language(text: str) -> str:
+    """ISO 639-1 code of `text`; "en" when detection fails."""
+    return "en" if _looks_english(text) else _langdetect(text)
+
+
+def _langdetect(text: str) -> str:
+    _init_detector()
+    from langdetect import detect
 
-def translate_to_english(text: str) -> tuple[str, bool]:
     try:
-        lang = detect(text)
+        return detect(text)
+    except Exception:
+        return "en"
+
+
+# Bump when translation_prompt() changes so cached translations made with the old wording are not served.
+TRANSLATION_PROMPT_VERSION = 1
+
+
+def translation_prompt(text: str, agent_name: str | None = None) -> str:
+    target = f" by an AI agent named '{agent_name}'" if agent_name else ""
+    return (
+        "You are a professional translator and assistant.\n"
+        f"Translate and adapt the following request into clear, technical English, ready to be interpreted{target}.\n"
+        "Maintain the intent and clarify ambiguities if needed. Reply with the translation only.\n\n"
+        f"Original input:\n{text}"
+    )
+
+
+class TranslationCache:
+    """
+    Translations by sha256 of the source text, the target agent and the prompt version
+    (the translation is adapted per agent); in-process LRU, or diskcache when
+    TRANSLATION_CACHE_DIR is set.
+    """
+
+    def __init__(self, max_entries: int, disk_dir: str | None = None):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+        if disk_dir:
+            from diskcache import Cache
+            self._disk = Cache(disk_dir)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text: str, agent_name: str | None = None) -> str:
+        raw = f"v{TRANSLATION_PROMPT_VERSION}\0{agent_name or ''}\0{text.strip()}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, text: str, agent_name: str | None = None) -> str | None:
+        key = self.key(text, agent_name)
+        if self._disk is not None:
+            value = self._disk.get(key)
+        else:
+            with self._lock:
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, text: str, translated: str, agent_name: str | None = None):
+        key = self.key(text, agent_name)
+        if self._disk is not None:
+            self._disk.set(key, translated)
+            return
+        with self._lock:
+            self._entries[key] = translated
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+translation_cache = TranslationCache(TRANSLATION_CACHE_SIZE, TRANSLATION_CACHE_DIR)
+
+
+async def _translate_locally(text: str, agent_name: str | None) -> str | None:
+    from projectmind.agents.agent_factory import AgentFactory
+
+    try:
+        translator, _, _ = await AgentFactory.aresolve(TRANSLATOR_AGENT)
+        output = await translator.arun(translation_prompt(text, agent_name), timeout=TRANSLATION_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning(f"⏱️ Local translation timed out after {TRANSLATION_TIMEOUT:.0f}s")
+        return None
     except Exception as e:
-        return text, False  # fallback en caso de fallo de detección
+        logger.warning(f"⚠️ Local translation unavailable: {e}")
+        return None
 
+    output = (output or "").strip()
+    if not output or output.startswith("⚠️ Failed"):
+        return None
+    return output
+
+
+async def _translate_remotely(text: str) -> str | None:
+    from deep_translator import GoogleTranslator
+
+    try:
+        return await asyncio.to_thread(GoogleTranslator(source="auto", target="en").translate, text)
+    except Exception as e:
+        logger.warning(f"⚠️ Remote translation failed: {e}")
+        return None
+
+
+async def translate_to_english(text: str, agent_name: str | None = None) -> tuple[str, bool]:
+    """
+    Returns (text_in_english, was_translated).
+
+    English input short-circuits on an ASCII/stop-word check before langdetect.
+    Other languages are looked up in the translation cache, then translated by
+    the local translator agent (bounded by TRANSLATION_TIMEOUT); Google is only
+    tried when TRANSLATION_ALLOW_REMOTE=1. When nothing can translate, the
+    original text is returned untranslated.
+    """
+    started = time.perf_counter()
+    lang = "en" if _looks_english(text) else await asyncio.to_thread(_langdetect, text)
     if lang == "en":
-        return text, False  # No necesita traducción
+        return text, False
+
+    translated = translation_cache.get(text, agent_name)
+    source = "cache"
+    if translated is None:
+        translated, source = await _translate_locally(text, agent_name), "local"
+        if translated is None and TRANSLATION_ALLOW_REMOTE:
+            translated, source = await _translate_remotely(text), "remote"
+        if translated is None:
+            logger.warning(f"🌐 Could not translate '{lang}' input, using it as is")
+            return text, False
+        translation_cache.put(text, translated, agent_name)
 
-    translated = GoogleTranslator(source='auto', target='en').translate(text)
+    logger.info(f"🌐 Translated '{lang}' input ({source}, {(time.perf_counter() - started) * 1000:.0f} ms)")
     return translated, True
@@ -0,0 +1,325 @@
+# projectmind/utils/metrics.py
+
+import bisect
+import contextvars
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator
+from loguru import logger
+
+# Pushgateway base URL for one-shot scripts (e.g. http://localhost:9091); unset = no push.
+METRICS_PUSHGATEWAY_URL = os.getenv("METRICS_PUSHGATEWAY_URL") or None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 50, 75, 100, 200)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, **labels):
+        """Mirrors a total kept elsewhere (e.g. a cache's own hit counter), read at scrape time."""
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def replace(self, values: dict[tuple, float]):
+        """Swaps in a complete set of series (label tuples in label_names order); series not given disappear."""
+        with self._lock:
+            self._values = {tuple(str(v) for v in key): float(value) for key, value in values.items()}
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.label_names, k)} {v}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self.set_total(value, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, list] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        lines = self.header()
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+            inf = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, key, inf)} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {series[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    """
+    Process-wide metrics in the Prometheus text exposition format (0.0.4).
+
+    Recording is a dict update under a lock, cheap enough for per-run and
+    per-query call sites; nothing is recorded per generated token. Gauges that
+    mirror existing stats (queues, model pool) are refreshed by collectors at
+    scrape time instead of being kept up to date on every change.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def add_collector(self, collector: Callable[[], None]):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in list(self._collectors):
+            try:
+                collector()
+            except Exception as e:
+                logger.warning(f"⚠️ Metrics collector failed: {e}")
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+
+def counter(name: str, help: str, labels: Iterable[str] = ()) -> Counter:
+    return registry.register(Counter(name, help, labels))
+
+
+def gauge(name: str, help: str, labels: Iterable[str] = ()) -> Gauge:
+    return registry.register(Gauge(name, help, labels))
+
+
+def histogram(name: str, help: str, labels: Iterable[str] = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+    return registry.register(Histogram(name, help, labels, buckets))
+
+
+agent_requests = counter("projectmind_agent_requests_total", "Agent runs by outcome", ["agent", "status"])
+agent_run_seconds = histogram("projectmind_agent_run_seconds", "End-to-end agent_node duration", ["agent"])
+llm_ttft_seconds = histogram("projectmind_llm_ttft_seconds", "Time to first token", ["model"])
+llm_tokens_per_second = histogram(
+    "projectmind_llm_tokens_per_second", "Generation speed", ["model"], buckets=TOKENS_PER_SECOND_BUCKETS
+)
+llm_tokens = counter("projectmind_llm_tokens_total", "Prompt and completion tokens", ["model", "kind"])
+llm_queue_wait_seconds = histogram("projectmind_llm_queue_wait_seconds", "Wait for a scheduler slot", ["model"])
+cache_requests = counter("projectmind_cache_requests_total", "Cache lookups by cache and result", ["cache", "result"])
+scheduler_queue_depth = gauge("projectmind_scheduler_queue_depth", "Inference jobs waiting per model", ["model"])
+scheduler_active = gauge("projectmind_scheduler_active", "Inference jobs running per model", ["model"])
+model_pool_resident_bytes = gauge("projectmind_model_pool_resident_bytes", "Bytes of model weights held by the pool")
+model_pool_models = gauge("projectmind_model_pool_models", "Loaded llama.cpp contexts (replicas included)", ["model", "in_use"])
+job_queue_depth = gauge("projectmind_job_queue_depth", "Slack jobs waiting for a worker")
+slack_outbox_depth = gauge("projectmind_slack_outbox_depth", "Slack notifications waiting for delivery")
+db_query_seconds = histogram("projectmind_db_query_seconds", "SQL statement latency", ["operation"])
+slack_delivery_seconds = histogram("projectmind_slack_delivery_seconds", "Slack notification latency from enqueue", ["status"])
+
+
+def record_cache_totals(cache: str, hits: int, misses: int):
+    cache_requests.set_total(hits, cache=cache, result="hit")
+    cache_requests.set_total(misses, cache=cache, result="miss")
+
+
+def record_run(agent: str, model: str, status: str, seconds: float, llm_stats: dict):
+    """Once per agent run; the token loop itself is never instrumented."""
+    agent_requests.inc(agent=agent, status=status)
+    agent_run_seconds.observe(seconds, agent=agent)
+    if llm_stats.get("ttft_ms") is not None:
+        llm_ttft_seconds.observe(llm_stats["ttft_ms"] / 1000, model=model)
+    if llm_stats.get("queue_wait_ms") is not None:
+        llm_queue_wait_seconds.observe(llm_stats["queue_wait_ms"] / 1000, model=model)
+    completion, generation_ms = llm_stats.get("completion_tokens"), llm_stats.get("generation_ms")
+    if completion and generation_ms:
+        llm_tokens_per_second.observe(completion * 1000 / generation_ms, model=model)
+    for kind in ("prompt", "completion"):
+        if llm_stats.get(f"{kind}_tokens"):
+            llm_tokens.inc(llm_stats[f"{kind}_tokens"], model=model, kind=kind)
+
+
+def _loaded(module: str, attr: str):
+    """An attribute of an already imported module; collectors never import llama.cpp themselves."""
+    mod = sys.modules.get(module)
+    return getattr(mod, attr, None) if mod is not None else None
+
+
+def _collect_runtime():
+    scheduler = _loaded("projectmind.llm.scheduler", "inference_scheduler")
+    if scheduler is not None:
+        for model, stats in scheduler.stats().items():
+            scheduler_queue_depth.set(stats["queue_depth"], model=model)
+            scheduler_active.set(stats["active"], model=model)
+
+    pool = _loaded("projectmind.llm.model_pool", "model_pool")
+    if pool is not None:
+        stats = pool.stats()
+        model_pool_resident_bytes.set(stats["resident_bytes"])
+        # Rebuilt on every scrape so evicted models and flipped in_use states do not linger
+        counts: dict[tuple, float] = {}
+        for entry in stats["models"]:
+            key = (entry["name"].split("#", 1)[0], str(entry["refcount"] > 0).lower())  # "name#N" = replica N
+            counts[key] = counts.get(key, 0) + 1
+        model_pool_models.replace(counts)
+
+    queue = _loaded("projectmind.interface.job_queue", "job_queue")
+    if queue is not None:
+        job_queue_depth.set(queue.stats()["queue_depth"])
+
+    notifier = _loaded("projectmind.utils.slack_notifier", "slack_notifier")
+    if notifier is not None:
+        slack_outbox_depth.set(notifier.stats()["queued"])
+
+    for cache, module, attr in (
+        ("response", "projectmind.llm.response_cache", "response_cache"),
+        ("prompt_state", "projectmind.llm.prompt_cache", "prompt_state_cache"),
+        ("memory", "projectmind.memory.memory_cache", "memory_cache"),
+        ("translation", "projectmind.utils.language_utils", "translation_cache"),
+    ):
+        instance = _loaded(module, attr)
+        if instance is not None:
+            record_cache_totals(cache, instance.hits, instance.misses)
+
+
+registry.add_collector(_collect_runtime)
+
+
+class DbTime:
+    """Statement time summed by db_timer(); concurrent statements each count in full."""
+
+    __slots__ = ("seconds",)
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    @property
+    def ms(self) -> float:
+        return round(self.seconds * 1000, 1)
+
+
+# Open db_timer() accumulators of the current context (tasks and SQLAlchemy greenlets inherit it)
+_db_timers: contextvars.ContextVar[tuple[DbTime, ...]] = contextvars.ContextVar("projectmind_db_timers", default=())
+
+
+@contextmanager
+def db_timer() -> Iterator[DbTime]:
+    """
+    Sums the execution time of every SQL statement issued inside the block,
+    including tasks started there, so callers record time spent in the database
+    rather than the wall time of code that also embeds, translates or waits.
+    """
+    timer = DbTime()
+    token = _db_timers.set(_db_timers.get() + (timer,))
+    try:
+        yield timer
+    finally:
+        _db_timers.reset(token)
+
+
+def instrument_engine(engine):
+    """Times every statement on a SQLAlchemy engine (pass AsyncEngine.sync_engine for async engines)."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["_query_started"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement else ""
+        db_query_seconds.observe(elapsed, operation=operation)
+        for timer in _db_timers.get():
+            timer.seconds += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        stack = context.connection.info.get("_query_started") if context.connection is not None else None
+        if stack:
+            stack.pop()
+
+
+def push_metrics(job: str, url: str | None = METRICS_PUSHGATEWAY_URL):
+    """Pushes the current registry to a Prometheus Pushgateway (one-shot scripts). No-op without a URL."""
+    if not url:
+        return
+    import httpx
+
+    try:
+        response = httpx.put(
+            f"{url.rstrip('/')}/metrics/job/{job}",
+            content=registry.render().encode(),
+            headers={"Content-Type": "text/plain; version=0.0.4"},
+            timeout=5.0,
+        )
+        response.raise_for_status()
+        logger.debug(f"📈 Pushed metrics for job '{job}'")
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to push metrics: {e}")
@@ -28,7 +28,7 @@ async def improve_prompt(
         if not agent_row:
             raise ValueError(f"⚠️ Agent '{prompt_optimizer_name}' not found in database.")
 
-        agent = AgentFactory.create(agent_row.name)
+        agent = await AgentFactory.acreate(agent_row.name)
 
         logger.debug(f"🔧 Improving prompt for '{agent_name}' (score: {score})")
 
@@ -0,0 +1,154 @@
+# projectmind/utils/single_flight.py
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable
+from loguru import logger
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Future
+    waiters: int = 0
+
+
+class SingleFlight:
+    """
+    Shares one in-flight coroutine between concurrent callers with the same key.
+
+    The first caller starts the work; callers that arrive before it finishes await
+    the same task instead of starting their own. A caller that gives up (cancelled
+    or timed out) only detaches itself; the work is cancelled once nobody waits on it.
+    Results are not cached: a key is forgotten as soon as its task completes.
+    """
+
+    def __init__(self):
+        self._flights: dict[Hashable, _Flight] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """Returns (result, shared); shared is True when the result came from another caller's run."""
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if flight is None:
+            flight = _Flight(task=asyncio.ensure_future(factory()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self.started += 1
+        else:
+            self.coalesced += 1
+            logger.debug(f"🔗 Coalesced request onto in-flight run ({flight.waiters} waiting)")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                # Forget it right away: a caller arriving before the task unwinds starts afresh
+                self._forget(key, flight)
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def _forget(self, key: Hashable, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+
+class _Broadcast:
+    def __init__(self):
+        self.items: list[Any] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.subscribers = 0
+        self.pump: asyncio.Task | None = None
+        self.state: dict = {}  # filled by the source (e.g. run stats), read by every consumer once done
+        self._changed = asyncio.Event()
+
+    def publish(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def changed(self):
+        await self._changed.wait()
+
+
+class SharedStream:
+    """
+    Streaming counterpart of SingleFlight: one async iterator fanned out to
+    every concurrent consumer with the same key.
+
+    A consumer that joins late first replays the items produced so far, then
+    follows live. The source is cancelled once its last consumer leaves.
+    """
+
+    def __init__(self):
+        self._streams: dict[Hashable, _Broadcast] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def subscribe(
+        self, key: Hashable, factory: Callable[[dict], AsyncIterator[Any]]
+    ) -> tuple[AsyncIterator[Any], dict, bool]:
+        """
+        Returns (iterator, state, shared). `factory(state)` builds the source; `state`
+        is the dict it was given, complete once the iterator is exhausted. shared is
+        True when another consumer's stream is reused.
+        """
+        broadcast = self._streams.get(key)
+        shared = broadcast is not None
+        if broadcast is None:
+            broadcast = _Broadcast()
+            self._streams[key] = broadcast
+            broadcast.pump = asyncio.ensure_future(self._pump(key, broadcast, factory))
+            self.started += 1
+        else:
+            self.coalesced += 1
+            logger.debug(f"🔗 Coalesced stream onto in-flight run ({broadcast.subscribers} consuming)")
+        broadcast.subscribers += 1
+        return self._follow(key, broadcast), broadcast.state, shared
+
+    async def _pump(self, key: Hashable, broadcast: _Broadcast, factory: Callable[[dict], AsyncIterator[Any]]):
+        try:
+            async for item in factory(broadcast.state):
+                broadcast.items.append(item)
+                broadcast.publish()
+        except asyncio.CancelledError:
+            raise  # only cancelled once nobody follows; never handed to a consumer
+        except BaseException as e:
+            broadcast.error = e
+        finally:
+            broadcast.done = True
+            self._forget(key, broadcast)
+            broadcast.publish()
+
+    async def _follow(self, key: Hashable, broadcast: _Broadcast) -> AsyncIterator[Any]:
+        index = 0
+        try:
+            while True:
+                while index < len(broadcast.items):
+                    yield broadcast.items[index]
+                    index += 1
+                if broadcast.done:
+                    if broadcast.error is not None:
+                        raise broadcast.error
+                    return
+                await broadcast.changed()
+        finally:
+            broadcast.subscribers -= 1
+            if broadcast.subscribers == 0 and not broadcast.done:
+                # Forget it right away: a subscriber arriving before the pump unwinds starts afresh
+                self._forget(key, broadcast)
+                broadcast.pump.cancel()
+
+    def in_flight(self) -> int:
+        return len(self._streams)
+
+    def _forget(self, key: Hashable, broadcast: _Broadcast):
+        if self._streams.get(key) is broadcast:
+            del self._streams[key]
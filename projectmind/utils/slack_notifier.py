@@ -1,28 +1,68 @@
 # projectmind/utils/slack_notifier.py
 
+import asyncio
 import os
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 import httpx
 from loguru import logger
+from projectmind.utils.metrics import slack_delivery_seconds
 
 SLACK_WEBHOOK_URL = os.getenv("SLACK_WEBHOOK_URL")
+# Notifications buffered while the webhook is slow or down; beyond this the drop policy applies.
+SLACK_OUTBOX_MAX = int(os.getenv("SLACK_OUTBOX_MAX", "200"))
+# "oldest" drops the oldest queued notification on overflow, "newest" rejects the incoming one.
+SLACK_OUTBOX_DROP = os.getenv("SLACK_OUTBOX_DROP", "oldest")
+# Notifications arriving within this window are coalesced into one Slack message.
+SLACK_BATCH_WINDOW = float(os.getenv("SLACK_BATCH_WINDOW", "0.5"))
+SLACK_BATCH_MAX = int(os.getenv("SLACK_BATCH_MAX", "10"))
+SLACK_MAX_RETRIES = int(os.getenv("SLACK_MAX_RETRIES", "4"))
+
+# Slack rejects webhook payloads much above 40k characters.
+MAX_MESSAGE_CHARS = 35000
+DIVIDER = "\n────────────\n"
 
-async def notify_slack(data: dict):
-    if not SLACK_WEBHOOK_URL:
-        logger.warning("⚠️ SLACK_WEBHOOK_URL not set. Skipping Slack notification.")
-        return
 
+def _retry_after(value: str | None, default: float) -> float:
+    """Seconds to wait from a Retry-After header: delta-seconds or an HTTP-date (RFC 9110)."""
+    if not value:
+        return default
     try:
-        agent = data.get("agent")
-        model_used = data.get("model_used")
-        version_old = data.get("version_old")
-        version_new = data.get("version_new")
-        score_old = data.get("score_old", "N/A")
-        score_new = data.get("score_new", "N/A")
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def format_message(data: dict) -> str:
+    agent = data.get("agent")
+
+    if "note" in data:
+        message = f"ℹ️ *{data['note']}* (agent `{agent}`)\n"
+        if data.get("original_input"):
+            message += f"*Original:* `{data['original_input']}`\n"
+        if data.get("translated_input"):
+            message += f"*Translated:* `{data['translated_input']}`\n"
+        return message
+
+    model_used = data.get("model_used")
+    version_old = data.get("version_old")
+    version_new = data.get("version_new")
+    score_old = data.get("score_old", "N/A")
+    score_new = data.get("score_new", "N/A")
 
-        original = data.get("original", "").strip()
-        improved = data.get("improved", "").strip()
+    original = data.get("original", "").strip()
+    improved = data.get("improved", "").strip()
 
-        message = f"""
+    return f"""
 🧠 *Prompt optimized for agent:* `{agent}`
 🧪 *Model used:* `{model_used}`
 📈 *Score improved:* `{score_old}` ➜ `{score_new}`
@@ -39,9 +79,159 @@ async def notify_slack(data: dict):
 ```
 """
 
-        async with httpx.AsyncClient() as client:
-            await client.post(SLACK_WEBHOOK_URL, json={"text": message})
-        logger.success(f"📤 Slack notification sent for agent '{agent}'")
 
-    except Exception as e:
-        logger.error(f"❌ Failed to send Slack notification: {e}")
\ No newline at end of file
+class SlackNotifier:
+    """
+    Background delivery of Slack webhook notifications.
+
+    notify() only appends to a bounded in-memory outbox; a drain task started on
+    first use posts through one long-lived pooled httpx client, so callers never
+    wait on Slack. Bursts that arrive within SLACK_BATCH_WINDOW are coalesced into
+    one message, failed posts are retried with exponential backoff (honouring
+    429 Retry-After), and on overflow the SLACK_OUTBOX_DROP policy decides which
+    notification is lost.
+    """
+
+    def __init__(self, webhook_url: str | None, max_size: int, drop: str = "oldest"):
+        self.webhook_url = webhook_url
+        self.max_size = max(max_size, 1)
+        self.drop = drop
+        self._outbox: deque[tuple[str, float]] = deque()
+        self._client: httpx.AsyncClient | None = None
+        self._drain_task: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._in_flight = 0  # notifications taken off the outbox but not yet delivered or given up
+        self.sent = 0
+        self.batches = 0
+        self.dropped = 0
+        self.failed = 0
+        self.latency_ms: deque[float] = deque(maxlen=500)
+
+    def notify(self, data: dict) -> bool:
+        """Queues a notification. Returns False when it was dropped (or Slack is not configured)."""
+        if not self.webhook_url:
+            logger.warning("⚠️ SLACK_WEBHOOK_URL not set. Skipping Slack notification.")
+            return False
+
+        if len(self._outbox) >= self.max_size:
+            self.dropped += 1
+            if self.drop == "newest":
+                logger.warning("🚫 Slack outbox full, dropped incoming notification")
+                return False
+            self._outbox.popleft()
+            logger.warning("🚫 Slack outbox full, dropped oldest notification")
+
+        self._outbox.append((format_message(data), time.monotonic()))
+        self._ensure_running()
+        self._wakeup.set()
+        return True
+
+    async def flush(self, timeout: float = 10.0):
+        """Waits until the outbox is empty and no batch is being posted (for one-shot scripts before they exit)."""
+        deadline = time.monotonic() + timeout
+        while (self._outbox or self._in_flight) and time.monotonic() < deadline:
+            if self._drain_task is None or self._drain_task.done():
+                break  # nothing left that could deliver them
+            await asyncio.sleep(0.1)
+
+    async def close(self):
+        await self.flush()
+        if self._drain_task is not None:
+            self._drain_task.cancel()
+            await asyncio.gather(self._drain_task, return_exceptions=True)
+            self._drain_task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        latencies = sorted(self.latency_ms)
+        return {
+            "queued": len(self._outbox),
+            "sent": self.sent,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "latency_ms_p95": latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+        }
+
+    def _ensure_running(self):
+        if self._drain_task is None or self._drain_task.done():
+            self._wakeup = asyncio.Event()
+            self._drain_task = asyncio.get_running_loop().create_task(self._drain())
+
+    async def _drain(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            # Give a burst a moment to finish so it goes out as one message
+            await asyncio.sleep(SLACK_BATCH_WINDOW)
+
+            while self._outbox:
+                batch, size = [], 0
+                while self._outbox and len(batch) < SLACK_BATCH_MAX:
+                    text, _ = self._outbox[0]
+                    if batch and size + len(text) > MAX_MESSAGE_CHARS:
+                        break
+                    batch.append(self._outbox.popleft())
+                    size += len(text) + len(DIVIDER)
+
+                self._in_flight = len(batch)
+                try:
+                    await self._deliver(batch)
+                except Exception as e:
+                    # Never let one bad batch stop the drain: the rest of the outbox still goes out
+                    self.failed += len(batch)
+                    logger.exception(f"❌ Unexpected error delivering {len(batch)} Slack notification(s): {e}")
+                finally:
+                    self._in_flight = 0
+
+    async def _deliver(self, batch: list[tuple[str, float]]):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(10.0, connect=5.0),
+                limits=httpx.Limits(max_connections=4, max_keepalive_connections=2),
+            )
+
+        text = DIVIDER.join(message for message, _ in batch)[:MAX_MESSAGE_CHARS]
+        for attempt in range(SLACK_MAX_RETRIES + 1):
+            try:
+                response = await self._client.post(self.webhook_url, json={"text": text})
+                if response.status_code == 429:
+                    delay = _retry_after(response.headers.get("Retry-After"), 2 ** attempt)
+                elif response.status_code >= 500:
+                    delay = 2 ** attempt
+                else:
+                    response.raise_for_status()
+                    now = time.monotonic()
+                    for _, queued_at in batch:
+                        self.latency_ms.append((now - queued_at) * 1000)
+                        slack_delivery_seconds.observe(now - queued_at, status="sent")
+                    self.sent += len(batch)
+                    self.batches += 1
+                    logger.success(f"📤 Slack notification sent ({len(batch)} coalesced)")
+                    return
+            except httpx.HTTPStatusError as e:
+                # 4xx other than 429 will not get better on retry
+                logger.error(f"❌ Failed to send Slack notification: {e}")
+                break
+            except httpx.HTTPError as e:
+                delay = 2 ** attempt
+                logger.warning(f"⚠️ Slack delivery error (attempt {attempt + 1}): {e}")
+
+            if attempt < SLACK_MAX_RETRIES:
+                await asyncio.sleep(delay)
+
+        self.failed += len(batch)
+        now = time.monotonic()
+        for _, queued_at in batch:
+            slack_delivery_seconds.observe(now - queued_at, status="failed")
+        logger.error(f"❌ Gave up on {len(batch)} Slack notification(s)")
+
+
+slack_notifier = SlackNotifier(SLACK_WEBHOOK_URL, max_size=SLACK_OUTBOX_MAX, drop=SLACK_OUTBOX_DROP)
+
+
+async def notify_slack(data: dict):
+    """Queues a notification for background delivery; returns immediately."""
+    slack_notifier.notify(data)
@@ -2,10 +2,18 @@ from loguru import logger
 from projectmind.tasks.task_manager import save_tasks_from_output
 
 
-async def try_saving_tasks(session, project, agent_row, agent_name, output):
+async def try_saving_tasks(session, project, agent_row, agent_name, output, commit=True) -> list:
+    """Returns the ids of newly created tasks (empty if none or on failure)."""
     if project and agent_row.can_create_tasks:
         try:
-            await save_tasks_from_output(project.id, agent_name, output, session)
-            logger.success(f"📝 Tasks saved by {agent_name}")
+            if commit:
+                task_ids = await save_tasks_from_output(project.id, agent_name, output, session)
+            else:
+                # Inside the caller's transaction: isolate failures in a savepoint
+                async with session.begin_nested():
+                    task_ids = await save_tasks_from_output(project.id, agent_name, output, session, commit=False)
+            logger.success(f"📝 {len(task_ids)} tasks saved by {agent_name}")
+            return task_ids
         except Exception as e:
             logger.error(f"❌ Error saving tasks: {e}")
+    return []
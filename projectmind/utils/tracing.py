@@ -0,0 +1,333 @@
+# projectmind/utils/tracing.py
+
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+from loguru import logger
+
+# Spans are exported as JSON lines to this file ...
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH") or None
+# ... and/or POSTed in OTLP/HTTP JSON shape to a collector (e.g. http://localhost:4318/v1/traces).
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT") or None
+# Fraction of root spans (i.e. requests) that are recorded; children follow their root's decision.
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "projectmind")
+# Spans buffered for the exporter thread; beyond this new spans are dropped.
+TRACE_QUEUE_MAX = int(os.getenv("TRACE_QUEUE_MAX", "10000"))
+
+ENABLED = bool(TRACE_EXPORT_PATH or TRACE_OTLP_ENDPOINT)
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    root: "Span | None" = None
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"
+    error: str | None = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3) if self.end_ns else None,
+            "attributes": self.attributes,
+            "status": self.status,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Returned for unsampled traces so call sites never need to check."""
+
+    trace_id = None
+    span_id = None
+
+    def set(self, **attributes):
+        pass
+
+
+_NOOP = _NoopSpan()
+# Current span, or _NOOP inside an unsampled trace, or None outside any trace
+_current: contextvars.ContextVar[Span | _NoopSpan | None] = contextvars.ContextVar("projectmind_span", default=None)
+
+
+class _Exporter:
+    """Background thread that batches finished spans to the JSONL file and/or the OTLP endpoint."""
+
+    def __init__(self):
+        self._queue: queue.Queue[Span] = queue.Queue(maxsize=TRACE_QUEUE_MAX)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def submit(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                    self._thread.start()
+
+    def flush(self, timeout: float = 5.0):
+        """Waits until every submitted span is written, including the batch being exported right now."""
+        if self._thread is None:
+            return
+        # Queue.join() has no timeout; wait on it from a helper thread instead
+        joiner = threading.Thread(target=self._queue.join, name="trace-flush", daemon=True)
+        joiner.start()
+        joiner.join(timeout)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 512:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._export(batch)
+            except Exception as e:
+                logger.warning(f"⚠️ Trace export failed ({len(batch)} spans): {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _export(self, batch: list[Span]):
+        if TRACE_EXPORT_PATH:
+            with open(TRACE_EXPORT_PATH, "a", encoding="utf-8") as f:
+                for span in batch:
+                    f.write(json.dumps(span.to_dict(), default=str) + "\n")
+        if TRACE_OTLP_ENDPOINT:
+            import httpx
+            httpx.post(TRACE_OTLP_ENDPOINT, json=_otlp_payload(batch), timeout=5.0).raise_for_status()
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_payload(batch: list[Span]) -> dict:
+    spans = [
+        {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+            "status": {"code": 2, "message": span.error or ""} if span.status == "error" else {"code": 1},
+        }
+        for span in batch
+    ]
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": TRACE_SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "projectmind.tracing"}, "spans": spans}],
+        }]
+    }
+
+
+exporter = _Exporter()
+atexit.register(exporter.flush)
+
+
+def _open(name: str, attributes: dict) -> Span | _NoopSpan | None:
+    if not ENABLED:
+        return None
+    parent = _current.get()
+    if parent is _NOOP:
+        return _NOOP
+    if parent is None:
+        if random.random() >= TRACE_SAMPLE_RATE:
+            return _NOOP
+        span = Span(name=name, trace_id=secrets.token_hex(16), span_id=secrets.token_hex(8), parent_id=None)
+        span.root = span
+    else:
+        span = Span(name=name, trace_id=parent.trace_id, span_id=secrets.token_hex(8), parent_id=parent.span_id, root=parent.root)
+    span.attributes.update(attributes)
+    return span
+
+
+def _close(span: Span | _NoopSpan | None, error: BaseException | None = None):
+    if not isinstance(span, Span):
+        return
+    span.end_ns = time.time_ns()
+    if error is not None:
+        span.status = "error"
+        span.error = f"{type(error).__name__}: {error}"
+    exporter.submit(span)
+
+
+@contextmanager
+def start_span(name: str, **attributes) -> Iterator[Span | _NoopSpan]:
+    """
+    Opens a child of the current span (or a new, possibly sampled-out trace).
+    Works in sync and async code; the span is current for everything awaited or
+    called inside, including tasks created there. Yields a no-op span when
+    tracing is disabled or the trace is not sampled.
+    """
+    span = _open(name, attributes)
+    if span is None:
+        yield _NOOP
+        return
+
+    token = _current.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        _close(span, e)
+        raise
+    else:
+        _close(span)
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            pass  # generator resumed in another context; nothing to restore
+
+
+def open_span(name: str, **attributes) -> Span | _NoopSpan:
+    """
+    A child span that is not made current, for generators: a contextvar set
+    inside a generator would leak into its consumer between yields. End it with
+    end_span().
+    """
+    return _open(name, attributes) or _NOOP
+
+
+def end_span(span: Span | _NoopSpan, error: BaseException | None = None):
+    _close(span, error)
+
+
+@contextmanager
+def activate(span: Span | _NoopSpan) -> Iterator[Span | _NoopSpan]:
+    """
+    Makes a span from open_span() current for the block without ending it, e.g.
+    around each step of an iterator the span is driving.
+    """
+    token = _current.set(span) if ENABLED else None
+    try:
+        yield span
+    finally:
+        if token is not None:
+            _current.reset(token)
+
+
+@contextmanager
+def use_span(span: Span | _NoopSpan) -> Iterator[Span | _NoopSpan]:
+    """
+    Makes a span from open_span() current for the block and ends it on exit;
+    used to carry a request's root span over to the worker that serves it.
+    """
+    token = _current.set(span) if ENABLED else None
+    try:
+        yield span
+    except BaseException as e:
+        _close(span, e)
+        raise
+    else:
+        _close(span)
+    finally:
+        if token is not None:
+            _current.reset(token)
+
+
+def traced(name: str | None = None):
+    """Decorator form of start_span for sync and async functions."""
+    def decorate(fn):
+        span_name = name or fn.__qualname__
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with start_span(span_name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with start_span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorate
+
+
+def current_span() -> Span | _NoopSpan:
+    return _current.get() or _NOOP
+
+
+def current_trace_id() -> str | None:
+    return current_span().trace_id
+
+
+def set_trace_attributes(**attributes):
+    """Sets attributes on the root span of the current trace (e.g. run_id once the AgentRun exists)."""
+    span = _current.get()
+    if isinstance(span, Span):
+        span.root.set(**attributes)
+
+
+def instrument_engine(engine):
+    """Emits a db.query span per statement (pass AsyncEngine.sync_engine for async engines)."""
+    if not ENABLED:
+        return
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        # Only inside a sampled trace: background polls (task claims, heartbeats) must not start traces
+        span = None
+        if isinstance(_current.get(), Span):
+            span = _open("db.query", {"db.statement": statement[:300], "db.executemany": executemany})
+        conn.info.setdefault("_trace_spans", []).append(span)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        span = conn.info["_trace_spans"].pop()
+        if isinstance(span, Span) and cursor.rowcount is not None and cursor.rowcount >= 0:
+            span.set(**{"db.rowcount": cursor.rowcount})
+        _close(span)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        stack = context.connection.info.get("_trace_spans") if context.connection is not None else None
+        if stack:
+            _close(stack.pop(), context.original_exception)
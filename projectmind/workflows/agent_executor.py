@@ -1,132 +1,236 @@
 # projectmind/workflows/agent_executor.py
 
-import uuid
+import os
+import time
+import asyncio
+import psutil
 from typing import Dict, Any
-from sqlalchemy import select
 from loguru import logger
+from langgraph.config import get_stream_writer
 
 from projectmind.agents.agent_factory import AgentFactory
-from projectmind.db.models import AgentRun, Prompt, Agent
+from projectmind.db.models import AgentRun
 from projectmind.utils.language_utils import translate_to_english
 from projectmind.utils.slack_notifier import notify_slack
-from projectmind.db.crud.project import get_project_by_name, create_project
-from projectmind.db.session_async import AsyncSessionLocal
-from projectmind.utils.context_handler import load_context, save_context
-from projectmind.utils.task_handler import try_saving_tasks
+from projectmind.workflows.run_persistence import fetch_project, fetch_context_items, persist_run
+from projectmind.utils.context_assembler import assemble_context
+from projectmind.utils.metrics import agent_requests, db_timer, record_run
+from projectmind.utils.tracing import start_span, current_trace_id, set_trace_attributes
 from projectmind.prompts.prompt_manager import PromptManager
 from projectmind.utils.prompt_optimizer import maybe_optimize_prompt
 
+# Upper bound for a single generation in seconds (0 = no limit).
+AGENT_RUN_TIMEOUT = float(os.getenv("AGENT_RUN_TIMEOUT", "0")) or None
+
+
+# Generation telemetry a coalesced follower would only copy from the run it joined
+_LEADER_STATS = (
+    "prompt_tokens", "completion_tokens", "ttft_ms", "prompt_eval_ms",
+    "generation_ms", "model_load_ms", "model_cache_hit", "queue_wait_ms",
+)
+
+
+def _rss_mb() -> float:
+    """Resident memory at the end of the run (ru_maxrss would be the process-lifetime peak)."""
+    return round(psutil.Process().memory_info().rss / 2**20, 1)
+
+
+async def _timed(timings: dict, stage: str, awaitable):
+    started = time.perf_counter()
+    try:
+        with start_span(f"agent_node.{stage}"):
+            return await awaitable
+    finally:
+        timings[stage] = round((time.perf_counter() - started) * 1000, 1)
+
+
+async def _prepare(agent_name: str, user_prompt: str, project_name: str | None, timings: dict):
+    """
+    Pre-inference stages, overlapped:
+    agent resolution, translation and the project lookup start together; memory
+    retrieval starts as soon as the agent and the (translated) query are known.
+    """
+    resolve = asyncio.create_task(_timed(timings, "resolve_agent", AgentFactory.aresolve(agent_name)))
+    translate = asyncio.create_task(_timed(timings, "translate", translate_to_english(user_prompt, agent_name)))
+    project = asyncio.create_task(_timed(timings, "project", fetch_project(project_name)))
+
+    async def memory():
+        (agent, agent_row, _), (translated, was_translated) = await asyncio.gather(resolve, translate)
+        query = translated if was_translated else user_prompt
+        return await _timed(timings, "memory", fetch_context_items(agent, agent_row, agent_name, project_name, query=query))
+
+    stages = [resolve, translate, project, asyncio.create_task(memory())]
+    try:
+        return await asyncio.gather(*stages)
+    except BaseException:
+        for stage in stages:
+            stage.cancel()
+        raise
+
 
 async def agent_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    agent_name = state.get("agent_name")
+    with start_span("agent_node", agent=agent_name, streamed=bool(state.get("stream"))) as span:
+        # Successful runs are recorded by _run_agent (record_run); failures of any stage are counted here
+        try:
+            result = await _run_agent(state)
+        except TimeoutError:
+            agent_requests.inc(agent=agent_name, status="timeout")
+            raise
+        except Exception:
+            agent_requests.inc(agent=agent_name, status="error")
+            raise
+        span.set(run_id=result["run_id"])
+        return result
+
+
+async def _run_agent(state: Dict[str, Any]) -> Dict[str, Any]:
     agent_name = state.get("agent_name")
     user_prompt = state.get("input")
     project_name = state.get("project_name")
     slack_user = state.get("slack_user")
+    stream = bool(state.get("stream"))
 
     if not agent_name or user_prompt is None:
         raise ValueError("Missing 'agent_name' and/or 'input' in state")
 
     logger.info(f"🤖 Executing agent: {agent_name}")
 
-    async with AsyncSessionLocal() as session:
-        # Get or create project
-        project = None
-        if project_name:
-            project = await get_project_by_name(session, project_name)
-            if not project:
-                project = await create_project(session, str(uuid.uuid4()), name=project_name)
-
-        # Load agent
-        agent = AgentFactory.create(agent_name)
-
-        # Translate if needed
-        translated_input, was_translated = translate_to_english(user_prompt)
-        input_text = translated_input if was_translated else user_prompt
-
-        if was_translated:
-            await notify_slack({
-                "agent": agent_name,
-                "note": "Input was auto-translated to English.",
-                "original_input": user_prompt,
-                "translated_input": translated_input
-            })
-
-        # Get prompt
-        prompt_obj = (
-            await session.execute(
-                select(Prompt)
-                .where(Prompt.agent_name == agent_name, Prompt.task_type == "default", Prompt.is_active == True)
-                .order_by(Prompt.version.desc())
-                .limit(1)
-            )
-        ).scalar_one_or_none()
-
-        if not prompt_obj:
-            raise ValueError(f"No active prompt found for agent '{agent_name}'")
-
-        # Get agent config row
-        agent_row = (
-            await session.execute(select(Agent).where(Agent.name == agent_name))
-        ).scalar_one()
-
-        # Load context
-        context = await load_context(session, agent_row, agent, project, agent_name)
-
-        # Set prompt and format input
-        agent.definition.system_prompt = prompt_obj.system_prompt.strip()
-        if context:
-            input_text = f"{context.strip()}\n\n{input_text.strip()}"
-
-        # Run agent
-        output = agent.run(input_text)
-
-        # Save context and tasks
-        await save_context(session, agent_row, agent, project, agent_name, output)
-        await try_saving_tasks(session, project, agent_row, agent_name, output)
-
-        # Register run
-        run = AgentRun(
-            agent_name=agent_name,
-            task_type="default",
-            input_data=user_prompt,
-            output_data=output,
-            is_successful=bool(output),
-            effectiveness_score=None,
-            prompt_version=prompt_obj.version,
-            model_used=agent.llm.model.name,
-            config_used={
-                "temperature": agent.llm.config.temperature,
-                "top_p": agent.llm.config.top_p,
-                "stop_tokens": agent.llm.config.stop_tokens,
-            },
-            extra={
-                "context_used": bool(context),
-                "project_name": project.name if project else None,
-                "was_translated": was_translated,
-                "translated_input": translated_input if was_translated else None,
-                "slack_user": slack_user
-            }
+    # Agent, translation, project and memory load concurrently (separate sessions)
+    timings: dict[str, float] = {}
+    node_started = started = time.perf_counter()
+    # Only statement time: the memory stage also embeds the query, and both stages overlap
+    with db_timer() as prefetch_db:
+        (agent, agent_row, prompt_obj), (translated_input, was_translated), project, context_items = await _prepare(
+            agent_name, user_prompt, project_name, timings
         )
-        session.add(run)
-        await session.commit()
-        logger.success(f"✅ Agent run saved: {run.id}")
-
-        # 🧠 Evaluar y mejorar prompt si es necesario
-        # try:
-        #     if agent_row.type != "evaluate":
-        #         prompt_manager = PromptManager(session)
-        #         await maybe_optimize_prompt(
-        #             agent_row,
-        #             prompt_manager,
-        #             system_prompt=prompt_obj.system_prompt.strip(),
-        #             user_prompt=user_prompt,
-        #             response=output
-        #         )
-        # except Exception as e:
-        #     logger.warning(f"⚠️ Prompt optimization failed for '{agent_name}': {e}")
-
-        return {
-            **state,
-            "output": output,
-            "run_id": str(run.id)
+    timings["prepare"] = round((time.perf_counter() - started) * 1000, 1)
+    input_text = translated_input if was_translated else user_prompt
+
+    if was_translated:
+        await notify_slack({
+            "agent": agent_name,
+            "note": "Input was auto-translated to English.",
+            "original_input": user_prompt,
+            "translated_input": translated_input
+        })
+
+    # Fit memory into the token budget left by the system prompt, input and generation
+    assembled = await _timed(timings, "assemble_context", asyncio.to_thread(
+        assemble_context, agent.llm, agent.definition.system_prompt, input_text, context_items
+    ))
+    context = assembled.context
+
+    # Set prompt and format input
+    if context:
+        input_text = f"{context.strip()}\n\n{input_text.strip()}"
+
+    # Run agent
+    llm_stats: dict = {}
+    inference_started = time.perf_counter()
+    with start_span("agent_node.inference", model=agent.llm.model.name) as span:
+        if stream:
+            # Forward each delta to LangGraph's "custom" stream; the full text is persisted below.
+            writer = get_stream_writer()
+            chunks = []
+            try:
+                async for delta in agent.astream(input_text, timeout=AGENT_RUN_TIMEOUT, stats=llm_stats):
+                    chunks.append(delta)
+                    writer({"agent": agent_name, "token": delta})
+            except asyncio.TimeoutError:
+                logger.error(f"⏱️ Agent '{agent_name}' timed out after {AGENT_RUN_TIMEOUT}s")
+                raise TimeoutError(f"Agent '{agent_name}' timed out after {AGENT_RUN_TIMEOUT:.0f}s")
+            output = "".join(chunks).strip()
+        else:
+            # Inference runs on the model's scheduler slot; the loop keeps serving other requests.
+            try:
+                output = await agent.arun(input_text, timeout=AGENT_RUN_TIMEOUT, stats=llm_stats)
+            except asyncio.TimeoutError:
+                logger.error(f"⏱️ Agent '{agent_name}' timed out after {AGENT_RUN_TIMEOUT}s")
+                raise TimeoutError(f"Agent '{agent_name}' timed out after {AGENT_RUN_TIMEOUT:.0f}s")
+        span.set(coalesced=llm_stats.get("coalesced", False), response_cache_hit=llm_stats.get("response_cache_hit", False))
+        # Generation errors come back as the "⚠️ Failed to generate response" text (see BaseAgent.run)
+        failed = bool(llm_stats.get("error"))
+        if failed:
+            span.set(error=llm_stats["error"])
+    timings["inference"] = round((time.perf_counter() - inference_started) * 1000, 1)
+    if llm_stats.get("coalesced"):
+        # The generation ran (and is recorded) once, under the run that started it
+        llm_stats.update(dict.fromkeys(_LEADER_STATS))
+
+    # Register run
+    run = AgentRun(
+        agent_name=agent_name,
+        task_type="default",
+        input_data=user_prompt,
+        output_data=output,
+        is_successful=bool(output) and not failed,
+        effectiveness_score=None,
+        prompt_version=prompt_obj.version,
+        model_used=agent.llm.model.name,
+        prompt_tokens=llm_stats.get("prompt_tokens"),
+        completion_tokens=llm_stats.get("completion_tokens"),
+        ttft_ms=llm_stats.get("ttft_ms"),
+        prompt_eval_ms=llm_stats.get("prompt_eval_ms"),
+        generation_ms=llm_stats.get("generation_ms"),
+        model_load_ms=llm_stats.get("model_load_ms"),
+        model_cache_hit=llm_stats.get("model_cache_hit"),
+        queue_wait_ms=llm_stats.get("queue_wait_ms"),
+        db_ms=prefetch_db.ms,
+        rss_mb=_rss_mb(),
+        config_used={
+            "temperature": agent.llm.config.temperature,
+            "top_p": agent.llm.config.top_p,
+            "stop_tokens": agent.llm.config.stop_tokens,
+            "seed": agent.llm.seed,
+        },
+        extra={
+            "context_used": bool(context),
+            "project_name": project_name,
+            "was_translated": was_translated,
+            "translated_input": translated_input if was_translated else None,
+            "slack_user": slack_user,
+            "streamed": stream,
+            "db_prefetch_ms": prefetch_db.ms,
+            "context_tokens": assembled.token_counts,
+            "response_cache_hit": llm_stats.get("response_cache_hit", False),
+            "coalesced": llm_stats.get("coalesced", False),
+            "error": llm_stats.get("error"),
+            "timings": timings,
+            "trace_id": current_trace_id(),
         }
+    )
+
+    # Save context, tasks and run in a single transaction
+    with start_span("agent_node.persist_run"):
+        project, db_write_ms = await persist_run(
+            run, agent, agent_row, agent_name, project, project_name, output, store_output=not failed
+        )
+    # Lets a trace be looked up from the AgentRun row and the other way round
+    set_trace_attributes(run_id=run.id)
+    record_run(
+        agent_name, agent.llm.model.name, "error" if failed else ("ok" if output else "empty"),
+        time.perf_counter() - node_started, llm_stats,
+    )
+    logger.success(f"✅ Agent run saved: {run.id} (prepare {timings['prepare']:.0f} ms, inference {timings['inference']:.0f} ms, db write {db_write_ms:.0f} ms)")
+
+    # 🧠 Evaluar y mejorar prompt si es necesario
+    # try:
+    #     if agent_row.type != "evaluate":
+    #         prompt_manager = PromptManager(session)
+    #         await maybe_optimize_prompt(
+    #             agent_row,
+    #             prompt_manager,
+    #             system_prompt=prompt_obj.system_prompt.strip(),
+    #             user_prompt=user_prompt,
+    #             response=output
+    #         )
+    # except Exception as e:
+    #     logger.warning(f"⚠️ Prompt optimization failed for '{agent_name}': {e}")
+
+    return {
+        **state,
+        "output": output,
+        "run_id": str(run.id),
+        "extra": {**run.extra, "db_write_ms": round(db_write_ms, 1)},
+    }
@@ -1,20 +1,93 @@
+import asyncio
 import os
+import re
+import uuid
+from typing import Any, AsyncIterator, Dict
 from dotenv import load_dotenv
 from langgraph.graph import StateGraph
-from langgraph.checkpoint.postgres import PostgresSaver
 from langchain_core.runnables import RunnableLambda
+from loguru import logger
 
 from projectmind.workflows.agent_executor import agent_node
+from projectmind.utils.tracing import activate, end_span, open_span, start_span
 
 load_dotenv()
-DATABASE_URL = os.getenv("DATABASE_URL")
 
-with PostgresSaver.from_conn_string(DATABASE_URL) as saver:
-    saver.setup()
-    checkpointer = saver
+# Connections kept open for LangGraph checkpoints (shared by every flow run in the process).
+CHECKPOINT_POOL_SIZE = int(os.getenv("CHECKPOINT_POOL_SIZE", "5"))
 
+_pool = None
+_checkpointer = None
+_flow = None
+_init_lock = asyncio.Lock()
 
-def agent_flow():
+
+def _checkpoint_conninfo() -> str:
+    """libpq URL for psycopg; DATABASE_URL may carry a SQLAlchemy driver suffix (postgresql+psycopg2://)."""
+    url = os.getenv("CHECKPOINT_DATABASE_URL") or os.getenv("DATABASE_URL")
+    if not url:
+        raise RuntimeError("DATABASE_URL is not set in .env")
+    return re.sub(r"^postgresql\+\w+://", "postgresql://", url)
+
+
+async def _checkpoints_up_to_date(pool, saver) -> bool:
+    """True when checkpoint_migrations already holds the saver's latest migration."""
+    from psycopg.errors import UndefinedTable
+
+    async with pool.connection() as conn:
+        try:
+            cursor = await conn.execute("SELECT v FROM checkpoint_migrations ORDER BY v DESC LIMIT 1")
+            row = await cursor.fetchone()
+        except UndefinedTable:
+            return False
+    return row is not None and row["v"] >= len(saver.MIGRATIONS) - 1
+
+
+async def get_checkpointer():
+    """
+    Process-wide AsyncPostgresSaver over a psycopg connection pool, created on first use.
+
+    setup() (DDL) only runs when checkpoint_migrations is missing or behind, so a
+    normal process start costs one SELECT instead of a round of CREATE IF NOT EXISTS.
+    """
+    global _pool, _checkpointer
+    if _checkpointer is not None:
+        return _checkpointer
+
+    async with _init_lock:
+        if _checkpointer is None:
+            from psycopg.rows import dict_row
+            from psycopg_pool import AsyncConnectionPool
+            from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+
+            pool = AsyncConnectionPool(
+                _checkpoint_conninfo(),
+                min_size=1,
+                max_size=CHECKPOINT_POOL_SIZE,
+                kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+                open=False,
+            )
+            await pool.open()
+            saver = AsyncPostgresSaver(pool)
+
+            if not await _checkpoints_up_to_date(pool, saver):
+                logger.info("🛠️ Running LangGraph checkpoint migrations")
+                await saver.setup()
+
+            _pool, _checkpointer = pool, saver
+            logger.info(f"💾 Checkpointer ready (pool size {CHECKPOINT_POOL_SIZE})")
+    return _checkpointer
+
+
+async def close_checkpointer():
+    """Closes the checkpoint connection pool; the next flow run reopens it."""
+    global _pool, _checkpointer, _flow
+    if _pool is not None:
+        await _pool.close()
+    _pool = _checkpointer = _flow = None
+
+
+def build_agent_graph(checkpointer=None):
     workflow = StateGraph(dict)
     workflow.add_node("agent", RunnableLambda(agent_node))
 
@@ -23,4 +96,65 @@ def agent_flow():
 
     workflow.set_conditional_entry_point(router)
     workflow.set_finish_point("agent")
-    return workflow.compile().with_config({"checkpointer": checkpointer})
+    return workflow.compile(checkpointer=checkpointer)
+
+
+async def agent_flow():
+    """The compiled agent graph, built once per process with the shared checkpointer."""
+    global _flow
+    if _flow is None:
+        _flow = build_agent_graph(await get_checkpointer())
+    return _flow
+
+
+def flow_config(thread_id: str | None = None) -> dict:
+    """Run config for a checkpointed flow; each run gets its own thread unless one is given."""
+    return {"configurable": {"thread_id": thread_id or str(uuid.uuid4())}}
+
+
+async def run_agent_flow(inputs: Dict[str, Any], thread_id: str | None = None) -> Dict[str, Any]:
+    flow = await agent_flow()
+    config = flow_config(thread_id)
+    with start_span("agent_flow.ainvoke", agent=inputs.get("agent_name"), thread_id=config["configurable"]["thread_id"]):
+        return await flow.ainvoke(inputs, config=config)
+
+
+async def stream_agent_flow(inputs: Dict[str, Any], thread_id: str | None = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Runs the agent flow in streaming mode.
+
+    Yields {"token": str} events while the model generates, then a single
+    {"result": state} event with the final state (output, run_id, ...).
+    """
+    flow = await agent_flow()
+    config = flow_config(thread_id)
+    result = None
+
+    # Not start_span: a span made current in an async generator leaks into the consumer between
+    # yields. It is only made current while astream advances, which is when node tasks are created.
+    span = open_span("agent_flow.astream", agent=inputs.get("agent_name"), thread_id=config["configurable"]["thread_id"])
+    stream = flow.astream({**inputs, "stream": True}, config=config, stream_mode=["custom", "values"])
+    error = None
+    try:
+        while True:
+            with activate(span):
+                try:
+                    mode, chunk = await stream.__anext__()
+                except StopAsyncIteration:
+                    break
+            if mode == "custom" and "token" in chunk:
+                yield {"token": chunk["token"]}
+            elif mode == "values":
+                result = chunk
+    except GeneratorExit:
+        span.set(cancelled=True)
+        raise
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        with activate(span):
+            await stream.aclose()
+        end_span(span, error)
+
+    yield {"result": result}
@@ -0,0 +1,361 @@
+# projectmind/workflows/pipeline_builder.py
+
+import asyncio
+import operator
+import os
+import re
+import uuid
+from dataclasses import dataclass, field
+from typing import Annotated, Any, Dict, TypedDict
+from uuid import UUID
+from langgraph.graph import END, START, StateGraph
+from loguru import logger
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from projectmind.db.models.task import Task
+from projectmind.db.session_async import AsyncSessionLocal
+from projectmind.tasks.task_worker import (
+    TASK_LEASE_SECONDS, claim_tasks, release_tasks, renew_leases, set_owned, start_attempt,
+)
+from projectmind.workflows.agent_executor import agent_node
+from projectmind.workflows.flow_builder import get_checkpointer
+
+# Nodes that may be pre-processing (DB, context) at once; inference itself is bounded by
+# the per-model scheduler slots (LLAMA_PARALLEL_SLOTS / LLAMA_MODEL_SLOTS).
+PIPELINE_MAX_CONCURRENCY = int(os.getenv("PIPELINE_MAX_CONCURRENCY", "4"))
+
+
+@dataclass
+class PipelineStep:
+    name: str
+    agent_name: str
+    after: list[str] = field(default_factory=list)
+    # Optional str.format template over {input} and the outputs of earlier steps by name
+    prompt: str | None = None
+    task_id: UUID | None = None
+
+
+@dataclass
+class Pipeline:
+    name: str
+    steps: list[PipelineStep]
+
+    @classmethod
+    def from_dict(cls, spec: dict) -> "Pipeline":
+        """
+        Declarative pipeline, e.g.
+        {"name": "app", "steps": [
+            {"name": "plan", "agent": "planner"},
+            {"name": "backend", "agent": "backend_generator", "after": ["plan"]},
+            {"name": "frontend", "agent": "frontend_generator", "after": ["plan"]}]}
+        """
+        steps = [
+            PipelineStep(
+                name=s["name"],
+                agent_name=s.get("agent", s["name"]),
+                after=list(s.get("after", [])),
+                prompt=s.get("prompt"),
+                task_id=UUID(s["task_id"]) if s.get("task_id") else None,
+            )
+            for s in spec["steps"]
+        ]
+        return cls(name=spec["name"], steps=steps)
+
+    def to_dict(self) -> dict:
+        """The from_dict() spec of this pipeline; stored in the checkpoint so a resume rebuilds the same graph."""
+        return {"name": self.name, "steps": [
+            {
+                "name": s.name, "agent": s.agent_name, "after": list(s.after), "prompt": s.prompt,
+                "task_id": str(s.task_id) if s.task_id else None,
+            }
+            for s in self.steps
+        ]}
+
+    def validate(self):
+        names = {s.name for s in self.steps}
+        if len(names) != len(self.steps):
+            raise ValueError(f"Duplicate step names in pipeline '{self.name}'")
+        for step in self.steps:
+            missing = set(step.after) - names
+            if missing:
+                raise ValueError(f"Step '{step.name}' depends on unknown steps: {sorted(missing)}")
+
+        # Kahn's algorithm: anything left over sits on a cycle
+        pending = {s.name: set(s.after) for s in self.steps}
+        while True:
+            ready = [n for n, deps in pending.items() if not deps]
+            if not ready:
+                break
+            for n in ready:
+                del pending[n]
+            for deps in pending.values():
+                deps.difference_update(ready)
+        if pending:
+            raise ValueError(f"Pipeline '{self.name}' has a dependency cycle: {sorted(pending)}")
+
+
+def _merge(left: dict, right: dict) -> dict:
+    return {**left, **right}
+
+
+class PipelineState(TypedDict, total=False):
+    pipeline: dict  # Pipeline.to_dict() the thread was started with
+    input: str
+    project_name: str | None
+    slack_user: str | None
+    outputs: Annotated[dict, _merge]
+    run_ids: Annotated[dict, _merge]
+    completed: Annotated[list, operator.add]
+
+
+def _split_dependencies(raw: str | None) -> list[str]:
+    return [d.strip() for d in re.split(r"[,\n;]", raw or "") if d.strip()]
+
+
+async def pipeline_from_tasks(session: AsyncSession, project_id: UUID, executor: str, name: str | None = None) -> Pipeline:
+    """
+    Builds a pipeline from a project's pending tasks, one step per task run by `executor`.
+    Tasks whose lease expired (e.g. a crashed earlier pipeline run) count as pending.
+
+    A task waits for its parent and for every entry of `dependencies`
+    (task ids or task names, comma/semicolon/newline separated), like TaskWorker:
+    completed ones are satisfied, pending ones become edges, and a task that
+    depends on anything else (in progress elsewhere, failed) is left out, together
+    with everything downstream of it, so it never runs before its dependency.
+    """
+    rows = (await session.execute(
+        select(Task, or_(
+            Task.status == "pending",
+            and_(Task.status == "in_progress", Task.lease_expires_at < func.now()),
+        ).label("runnable"))
+        .where(Task.project_id == project_id)
+        .order_by(Task.created_at)
+    )).all()
+
+    by_id = {str(task.id): task for task, _ in rows}
+    by_name = {task.task_name: task for task, _ in rows if task.task_name}
+    runnable = {str(task.id) for task, is_runnable in rows if is_runnable}
+
+    after: dict[str, set[str]] = {}
+    blocked: dict[str, str] = {}  # task id -> reason
+    for task, _ in rows:
+        task_key = str(task.id)
+        if task_key not in runnable:
+            continue
+        targets = [by_id.get(str(task.parent_task_id))] if task.parent_task_id else []
+        targets += [by_id.get(dep) or by_name.get(dep) for dep in _split_dependencies(task.dependencies)]
+        after[task_key] = set()
+        for target in targets:
+            if target is None or target.id == task.id or target.status == "completed":
+                continue
+            if str(target.id) in runnable:
+                after[task_key].add(str(target.id))
+            else:
+                blocked[task_key] = f"waits for {target.id} ({target.status})"
+
+    # Whatever depends on a left-out task is left out as well
+    changed = True
+    while changed:
+        changed = False
+        for task_key, deps in after.items():
+            if task_key not in blocked and (held := deps & blocked.keys()):
+                blocked[task_key] = f"waits for {min(held)} (blocked)"
+                changed = True
+    if blocked:
+        logger.warning(f"⏸️ Skipping {len(blocked)} task(s) with unfinished dependencies outside the pipeline: {blocked}")
+
+    steps = [
+        PipelineStep(
+            name=task_key,
+            agent_name=executor,
+            after=sorted(deps),
+            prompt=f"Task: {by_id[task_key].task_name or ''}\n{by_id[task_key].description}",
+            task_id=by_id[task_key].id,
+        )
+        for task_key, deps in after.items()
+        if task_key not in blocked
+    ]
+    return Pipeline(name=name or f"tasks-{project_id}", steps=steps)
+
+
+def _step_input(step: PipelineStep, state: PipelineState) -> str:
+    outputs = state.get("outputs", {})
+    if step.prompt:
+        try:
+            text = step.prompt.format_map({"input": state.get("input", ""), **outputs})
+        except (KeyError, IndexError, ValueError):
+            text = step.prompt  # free text with stray braces (e.g. code in a task description)
+    else:
+        text = state.get("input", "")
+
+    upstream = [f"--- Output from {dep} ---\n{outputs[dep]}" for dep in step.after if dep in outputs]
+    return "\n\n".join([*upstream, text]) if upstream else text
+
+
+def _make_node(step: PipelineStep, owner: str):
+    async def run_step(state: PipelineState) -> dict:
+        # A resumed thread may replay a step whose result already made it into a checkpoint
+        if step.name in state.get("outputs", {}):
+            if step.task_id is not None and step.name in state.get("run_ids", {}):
+                await set_owned(
+                    step.task_id, owner, status="completed", run_id=int(state["run_ids"][step.name]),
+                    claimed_by=None, lease_expires_at=None,
+                )
+            return {}
+
+        logger.info(f"🧩 Pipeline step '{step.name}' → agent '{step.agent_name}'")
+        if step.task_id is not None:
+            await start_attempt(step.task_id, owner)
+        result = await agent_node({
+            "agent_name": step.agent_name,
+            "input": _step_input(step, state),
+            "project_name": state.get("project_name"),
+            "slack_user": state.get("slack_user"),
+        })
+
+        if step.task_id is not None:
+            # Fenced like TaskWorker: a pipeline that lost its lease does not overwrite the new owner
+            if not await set_owned(
+                step.task_id, owner, status="completed", run_id=int(result["run_id"]),
+                claimed_by=None, lease_expires_at=None,
+            ):
+                logger.warning(f"⚠️ Lost lease on task {step.task_id}; result kept in the pipeline only")
+
+        return {
+            "outputs": {step.name: result["output"]},
+            "run_ids": {step.name: result["run_id"]},
+            "completed": [step.name],
+        }
+
+    return run_step
+
+
+def build_pipeline_graph(pipeline: Pipeline, checkpointer=None, owner: str = ""):
+    """
+    Compiles a pipeline into a LangGraph graph.
+
+    Steps without dependencies start from START; a step with several
+    dependencies waits for all of them. Independent branches run in the
+    same superstep, i.e. concurrently. `owner` is the lease holder used to
+    mark task-backed steps completed.
+    """
+    pipeline.validate()
+    workflow = StateGraph(PipelineState)
+
+    for step in pipeline.steps:
+        workflow.add_node(step.name, _make_node(step, owner))
+
+    downstream = {dep for step in pipeline.steps for dep in step.after}
+    for step in pipeline.steps:
+        if not step.after:
+            workflow.add_edge(START, step.name)
+        elif len(step.after) == 1:
+            workflow.add_edge(step.after[0], step.name)
+        else:
+            workflow.add_edge(step.after, step.name)
+        if step.name not in downstream:
+            workflow.add_edge(step.name, END)
+
+    return workflow.compile(checkpointer=checkpointer)
+
+
+async def run_pipeline(
+    pipeline: Pipeline,
+    inputs: Dict[str, Any] | None = None,
+    thread_id: str | None = None,
+    max_concurrency: int = PIPELINE_MAX_CONCURRENCY,
+) -> Dict[str, Any]:
+    """
+    Runs (or resumes) a pipeline. Every completed step is checkpointed under
+    `thread_id`: calling again with the same thread_id after a failure skips the
+    steps that already finished and continues from the failed ones.
+    Returns the final state plus the thread_id used.
+
+    Steps backed by a Task are leased to the run up front (same lease as
+    TaskWorker), so no worker executes them meanwhile; the lease is renewed
+    while the run lasts and unfinished tasks go back to pending if it fails.
+
+    A resumed thread runs the pipeline stored in its checkpoint, not `pipeline`:
+    a graph rebuilt from the tasks still pending would lack the steps that
+    already finished and the edges leading out of them.
+    """
+    saved = await _saved_pipeline(thread_id) if thread_id else None
+    if saved is not None:
+        pipeline = saved
+    if not pipeline.steps:
+        return {"outputs": {}, "run_ids": {}, "completed": [], "thread_id": thread_id}
+
+    thread_id = thread_id or f"pipeline-{pipeline.name}-{uuid.uuid4()}"
+    owner = f"pipeline:{thread_id}"[:100]
+    task_ids = [step.task_id for step in pipeline.steps if step.task_id is not None]
+    if task_ids:
+        await _lease_pipeline_tasks(task_ids, owner)
+
+    heartbeat = asyncio.create_task(_renew_while_running(owner)) if task_ids else None
+    try:
+        result = await _invoke(pipeline, inputs, thread_id, owner, max_concurrency)
+    except BaseException:
+        if task_ids:
+            released = await release_tasks(owner)
+            if released:
+                logger.warning(f"↩️ Released {released} unfinished task(s) of pipeline '{pipeline.name}'")
+        raise
+    finally:
+        if heartbeat is not None:
+            heartbeat.cancel()
+
+    return {**result, "thread_id": thread_id}
+
+
+async def _saved_pipeline(thread_id: str) -> Pipeline | None:
+    checkpointer = await get_checkpointer()
+    saved = await checkpointer.aget_tuple({"configurable": {"thread_id": thread_id}})
+    spec = saved.checkpoint["channel_values"].get("pipeline") if saved else None
+    return Pipeline.from_dict(spec) if spec else None
+
+
+async def _lease_pipeline_tasks(task_ids: list[UUID], owner: str):
+    claimed = await claim_tasks(task_ids, owner)
+    async with AsyncSessionLocal() as session:
+        blocked = (await session.execute(
+            select(Task.id, Task.status, Task.claimed_by)
+            .where(Task.id.in_(set(task_ids) - claimed), Task.status != "completed")
+        )).all()
+    if blocked:
+        await release_tasks(owner)
+        held = ", ".join(f"{row.id} ({row.status}, {row.claimed_by or 'no owner'})" for row in blocked)
+        raise RuntimeError(f"Pipeline tasks are not claimable: {held}")
+
+
+async def _renew_while_running(owner: str):
+    while True:
+        await asyncio.sleep(TASK_LEASE_SECONDS / 3)
+        await renew_leases(owner)
+
+
+async def _invoke(
+    pipeline: Pipeline, inputs: Dict[str, Any] | None, thread_id: str, owner: str, max_concurrency: int
+) -> Dict[str, Any]:
+    graph = build_pipeline_graph(pipeline, await get_checkpointer(), owner)
+    config = {"configurable": {"thread_id": thread_id}, "max_concurrency": max_concurrency}
+
+    snapshot = await graph.aget_state(config)
+    if snapshot.next:
+        done = snapshot.values.get("completed", [])
+        logger.info(f"⏯️ Resuming pipeline '{pipeline.name}' ({len(done)}/{len(pipeline.steps)} steps done)")
+        result = await graph.ainvoke(None, config=config)
+    elif snapshot.values:
+        logger.info(f"✅ Pipeline '{pipeline.name}' already completed for thread {thread_id}")
+        result = snapshot.values
+    else:
+        logger.info(f"🚀 Starting pipeline '{pipeline.name}' with {len(pipeline.steps)} steps")
+        result = await graph.ainvoke(
+            {"outputs": {}, "run_ids": {}, "completed": [], **(inputs or {}), "pipeline": pipeline.to_dict()},
+            config=config,
+        )
+
+    missing = [step.name for step in pipeline.steps if step.name not in result.get("outputs", {})]
+    if missing:
+        raise RuntimeError(f"Pipeline '{pipeline.name}' stopped with unfinished steps: {missing}")
+    return result
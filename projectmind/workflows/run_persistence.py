@@ -0,0 +1,106 @@
+# projectmind/workflows/run_persistence.py
+
+import asyncio
+import time
+from dataclasses import dataclass
+from loguru import logger
+
+from projectmind.db.models import AgentRun, Project
+from projectmind.db.crud.project import get_project_by_name, get_or_create_project
+from projectmind.db.session_async import AsyncSessionLocal
+from projectmind.utils.context_handler import load_context_items, save_context
+from projectmind.utils.metrics import db_timer
+from projectmind.utils.task_handler import try_saving_tasks
+
+
+@dataclass
+class RunInputs:
+    project: Project | None
+    context_items: list[str]
+    db_ms: float
+
+
+async def fetch_project(project_name: str | None) -> Project | None:
+    if not project_name:
+        return None
+    async with AsyncSessionLocal() as session:
+        return await get_project_by_name(session, project_name)
+
+
+async def fetch_context_items(
+    agent,
+    agent_row,
+    agent_name: str,
+    project_name: str | None,
+    query: str | None = None,
+) -> list[str]:
+    """Memory items for the run, resolved by project name inside their own query and session."""
+    async with AsyncSessionLocal() as session:
+        return await load_context_items(
+            session, agent_row, agent, None, agent_name, project_name=project_name, query=query
+        )
+
+
+async def prefetch_run_inputs(
+    agent,
+    agent_row,
+    agent_name: str,
+    project_name: str | None,
+    query: str | None = None,
+) -> RunInputs:
+    """
+    Loads everything agent_node reads before inference.
+
+    The project row and the memory context are fetched concurrently on separate
+    sessions; memory is resolved by project name inside its own query, so
+    neither waits for the other. `query` enables semantic memory retrieval.
+    db_ms is the summed SQL statement time (embedding the query is not included).
+    """
+    with db_timer() as db_time:
+        project, context_items = await asyncio.gather(
+            fetch_project(project_name),
+            fetch_context_items(agent, agent_row, agent_name, project_name, query=query),
+        )
+    return RunInputs(project=project, context_items=context_items, db_ms=db_time.ms)
+
+
+async def persist_run(
+    run: AgentRun,
+    agent,
+    agent_row,
+    agent_name: str,
+    project: Project | None,
+    project_name: str | None,
+    output: str,
+    store_output: bool = True,
+) -> tuple[Project | None, float]:
+    """
+    Writes the project (if new), memory, tasks and the AgentRun in one transaction.
+
+    Memory and task failures are isolated in savepoints so they never lose the run
+    record. The ids of newly created tasks are stored in run.extra["task_ids"].
+    With store_output=False (a failed generation) only the run is written: the
+    output is neither remembered nor parsed for tasks.
+    run.db_ms is increased by the SQL statement time up to the final commit (the
+    run's own INSERT and the commit land after it is set; memory embedding is not
+    counted). Returns (project, db_ms) where db_ms is the transaction's wall time.
+    """
+    started = time.perf_counter()
+
+    with db_timer() as db_time:
+        async with AsyncSessionLocal() as session:
+            async with session.begin():
+                if project is None and project_name:
+                    project = await get_or_create_project(session, project_name)
+
+                task_ids = []
+                if store_output:
+                    await save_context(session, agent_row, agent, project, agent_name, output, commit=False)
+                    task_ids = await try_saving_tasks(session, project, agent_row, agent_name, output, commit=False)
+                run.extra = {**(run.extra or {}), "task_ids": [str(task_id) for task_id in task_ids]}
+                run.db_ms = round((run.db_ms or 0.0) + db_time.ms, 1)
+                session.add(run)
+
+    db_ms = (time.perf_counter() - started) * 1000
+    logger.debug(f"💾 Run persisted in one transaction ({db_ms:.0f} ms)")
+    return project, db_ms
@@ -1,10 +1,8 @@
 import asyncio
-from projectmind.workflows.agent_flow import agent_flow
+from projectmind.workflows.flow_builder import run_agent_flow
 
 async def main():
-    flow = agent_flow()
-
-    result = await flow.ainvoke({
+    result = await run_agent_flow({
         "agent_name": "planner",
         "input": "Build an app to manage book rentals",
         "slack_user": "U08RMCF50DU"
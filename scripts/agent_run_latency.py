@@ -0,0 +1,57 @@
+# scripts/agent_run_latency.py
+
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, select
+from projectmind.db.models.agent_run import AgentRun
+from projectmind.db.session_async import AsyncSessionLocal
+
+METRICS = ["ttft_ms", "prompt_eval_ms", "generation_ms", "queue_wait_ms", "db_ms"]
+
+
+def _pct(column, q: float):
+    return func.percentile_cont(q).within_group(column)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="p50/p95 latency per agent and model from AgentRun telemetry")
+    parser.add_argument("--hours", type=float, default=24, help="Look-back window")
+    parser.add_argument("--agent", help="Only this agent")
+    args = parser.parse_args()
+
+    since = datetime.now(timezone.utc) - timedelta(hours=args.hours)
+    columns = []
+    for name in METRICS:
+        column = getattr(AgentRun, name)
+        columns += [_pct(column, 0.5).label(f"{name}_p50"), _pct(column, 0.95).label(f"{name}_p95")]
+
+    tokens_per_sec = func.avg(AgentRun.completion_tokens * 1000.0 / func.nullif(AgentRun.generation_ms, 0))
+    stmt = (
+        select(AgentRun.agent_name, AgentRun.model_used, func.count().label("runs"), tokens_per_sec.label("tok_s"), *columns)
+        .where(AgentRun.created_at >= since)
+        .group_by(AgentRun.agent_name, AgentRun.model_used)
+        .order_by(AgentRun.agent_name, AgentRun.model_used)
+    )
+    if args.agent:
+        stmt = stmt.where(AgentRun.agent_name == args.agent)
+
+    async with AsyncSessionLocal() as session:
+        rows = (await session.execute(stmt)).mappings().all()
+
+    if not rows:
+        print("❌ No agent runs in the selected window.")
+        return
+
+    for row in rows:
+        print("─" * 60)
+        print(f"🧠 {row['agent_name']} on {row['model_used']} — {row['runs']} runs, {row['tok_s'] or 0:.1f} tok/s")
+        for name in METRICS:
+            p50, p95 = row[f"{name}_p50"], row[f"{name}_p95"]
+            if p50 is not None:
+                print(f"   {name:<15} p50 {p50:>9.0f}   p95 {p95:>9.0f}")
+    print("─" * 60)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
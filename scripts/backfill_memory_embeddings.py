@@ -0,0 +1,42 @@
+# scripts/backfill_memory_embeddings.py
+
+import asyncio
+from loguru import logger
+from sqlalchemy import select, update
+
+from projectmind.db.models.memory import Memory
+from projectmind.db.session_async import AsyncSessionLocal
+from projectmind.memory.embeddings import embedder, encode_embedding
+
+BATCH_SIZE = 64
+
+
+async def main():
+    if not embedder.enabled:
+        logger.error("❌ MEMORY_EMBEDDING_MODEL is not set.")
+        return
+
+    total = 0
+    async with AsyncSessionLocal() as session:
+        while True:
+            result = await session.execute(
+                select(Memory.id, Memory.value).where(Memory.embedding.is_(None)).limit(BATCH_SIZE)
+            )
+            rows = result.tuples().all()
+            if not rows:
+                break
+
+            vectors = await asyncio.to_thread(embedder.embed, [value for _, value in rows])
+            await session.execute(
+                update(Memory),
+                [{"id": memory_id, "embedding": encode_embedding(v)} for (memory_id, _), v in zip(rows, vectors)],
+            )
+            await session.commit()
+            total += len(rows)
+            logger.info(f"🧭 Embedded {total} memories so far")
+
+    logger.success(f"✅ Backfilled embeddings for {total} memories")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,7 +3,9 @@
 import argparse
 import asyncio
 from loguru import logger
-from projectmind.workflows.flow_builder import agent_flow  # <- actualizamos esto
+from projectmind.utils.metrics import push_metrics
+from projectmind.utils.slack_notifier import slack_notifier
+from projectmind.workflows.flow_builder import run_agent_flow, stream_agent_flow, close_checkpointer
 
 
 async def main():
@@ -12,19 +14,35 @@ async def main():
     parser.add_argument("input", help="User input for the agent")
     parser.add_argument("--project_name", help="Project name to scope memory/context", required=False)
     parser.add_argument("--user_id", help="Slack user ID (optional)", required=False)
+    parser.add_argument("--stream", help="Print tokens as they are generated", action="store_true")
 
     args = parser.parse_args()
 
     logger.info(f"🔁 Running agent: {args.agent}")
     logger.info(f"📝 Input: {args.input}")
 
-    flow = agent_flow()
-    result = await flow.ainvoke({
+    inputs = {
         "agent_name": args.agent,
         "input": args.input,
         "project_name": args.project_name,
         "slack_user": args.user_id
-    })
+    }
+
+    try:
+        if args.stream:
+            result = None
+            async for event in stream_agent_flow(inputs):
+                if "token" in event:
+                    print(event["token"], end="", flush=True)
+                else:
+                    result = event["result"]
+            print()
+        else:
+            result = await run_agent_flow(inputs)
+    finally:
+        await close_checkpointer()
+        await slack_notifier.close()
+        push_metrics("run_agent")
 
     logger.success("✅ Result:")
     print(result)
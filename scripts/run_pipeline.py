@@ -0,0 +1,55 @@
+# scripts/run_pipeline.py
+
+import argparse
+import asyncio
+import json
+from loguru import logger
+from projectmind.db.crud.project import get_project_by_name
+from projectmind.db.session_async import AsyncSessionLocal
+from projectmind.utils.metrics import push_metrics
+from projectmind.utils.slack_notifier import slack_notifier
+from projectmind.workflows.flow_builder import close_checkpointer
+from projectmind.workflows.pipeline_builder import Pipeline, pipeline_from_tasks, run_pipeline
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Run a multi-agent pipeline (declarative JSON or a project's pending tasks)")
+    parser.add_argument("--spec", help="Path to a JSON pipeline spec ({'name': ..., 'steps': [...]})")
+    parser.add_argument("--input", help="Initial input passed to the root steps", default="")
+    parser.add_argument("--project_name", help="Project name (memory scope; task source with --executor)")
+    parser.add_argument("--executor", help="Run the project's pending tasks with this agent instead of a spec")
+    parser.add_argument("--thread_id", help="Resume a previous run with this thread id")
+    args = parser.parse_args()
+
+    if args.executor:
+        if not args.project_name:
+            parser.error("--executor requires --project_name")
+        async with AsyncSessionLocal() as session:
+            project = await get_project_by_name(session, args.project_name)
+            if not project:
+                parser.error(f"Project '{args.project_name}' not found")
+            pipeline = await pipeline_from_tasks(session, project.id, args.executor)
+    elif args.spec:
+        with open(args.spec) as f:
+            pipeline = Pipeline.from_dict(json.load(f))
+    else:
+        parser.error("Either --spec or --executor is required")
+
+    try:
+        result = await run_pipeline(
+            pipeline,
+            inputs={"input": args.input, "project_name": args.project_name},
+            thread_id=args.thread_id,
+        )
+    finally:
+        await close_checkpointer()
+        await slack_notifier.close()
+        push_metrics("run_pipeline")
+
+    logger.success(f"✅ Pipeline finished (thread {result['thread_id']})")
+    for step, output in result.get("outputs", {}).items():
+        print(f"\n=== {step} (run {result['run_ids'].get(step)}) ===\n{output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
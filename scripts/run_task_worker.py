@@ -0,0 +1,35 @@
+# scripts/run_task_worker.py
+
+import argparse
+import asyncio
+import signal
+from projectmind.agents.agent_factory import AgentFactory
+from projectmind.api.app import METRICS_PORT, serve_in_background
+from projectmind.tasks.task_worker import TaskWorker, TASK_WORKER_CONCURRENCY
+from projectmind.utils.slack_notifier import slack_notifier
+from projectmind.workflows.flow_builder import close_checkpointer
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Claim and execute pending tasks with can_execute_tasks agents")
+    parser.add_argument("--concurrency", type=int, default=TASK_WORKER_CONCURRENCY, help="Tasks run at once by this process")
+    parser.add_argument("--worker_id", help="Stable worker id (defaults to host:pid:random)")
+    parser.add_argument("--metrics_port", type=int, default=METRICS_PORT, help="Serve /metrics on this port (0 = off)")
+    args = parser.parse_args()
+
+    worker = TaskWorker(concurrency=args.concurrency, worker_id=args.worker_id)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    AgentFactory.start_invalidation_listener()
+    serve_in_background(args.metrics_port)
+    try:
+        await worker.run()
+    finally:
+        await close_checkpointer()
+        await slack_notifier.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
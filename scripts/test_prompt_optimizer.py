@@ -2,14 +2,12 @@
 
 import asyncio
 from loguru import logger
-from projectmind.workflows.agent_flow import agent_flow
+from projectmind.workflows.flow_builder import run_agent_flow
 
 # 🧪 Reemplaza con un ID real de tu tabla "prompts"
 PROMPT_ID = "REPLACE_WITH_REAL_PROMPT_ID"
 
 async def main():
-    flow = agent_flow()
-
     state = {
         "agent_name": "prompt_optimizer",
         "input": {
@@ -21,7 +19,7 @@ async def main():
     }
 
     logger.info("🚀 Starting prompt_optimizer test...")
-    result = await flow.ainvoke(state)
+    result = await run_agent_flow(state)
     logger.success("🎯 Optimizer finished:")
     print(result)
 